@@ -1,34 +1,42 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-from PIL import Image, ImageTk, ImageDraw, ImageEnhance, ImageFilter
-from pdf2image import convert_from_path
-import pytesseract
+from PIL import ImageTk
 import sv_ttk
 import os
-import subprocess
+import time
 import threading
-import cv2
-import numpy as np
-
-# Configuración de Tesseract
-posibles_rutas = [
-    r"C:\Program Files\Tesseract-OCR\tesseract.exe",
-    r"C:\Program Files (x86)\Tesseract-OCR\tesseract.exe",
-    r"C:\Users\home\AppData\Local\Programs\Tesseract-OCR\tesseract.exe"
-]
-for ruta in posibles_rutas:
-    if os.path.exists(ruta):
-        pytesseract.pytesseract.tesseract_cmd = ruta
-        break
+from collections import Counter
+from visualocrtranslator import (DEFAULT_OCR_CONFIG, DEFAULT_PREPROCESS_CONFIG, DEFAULT_RENDER_CONFIG,
+                                 DEFAULT_TRANSLATION_CONFIG, JobScheduler, PageProvider, PageStore,
+                                 ResultCache, TextRecognizer, Translator, default_cache_path,
+                                 default_poppler_path, detect_text_regions, preprocess_image)
+from visualocrtranslator.export import export_pdf
+from visualocrtranslator.memory import DEFAULT_MEMORY_CONFIG, TranslationMemory, memory_path
+from visualocrtranslator.pages import unrotate_box
+from visualocrtranslator.preprocess import format_timings, preprocess_batch
+from visualocrtranslator.project import TranslationProject
+from visualocrtranslator.speculative import DEFAULT_SPECULATIVE_CONFIG, SpeculativeTranslator
+from visualocrtranslator.textlayer import TextLayer
+from visualocrtranslator.thumbnails import ThumbnailStore
+from visualocrtranslator.tiles import FAST, HIGH_QUALITY, TileCache
+
+# Alto de cada hueco de la barra de miniaturas (la miniatura más el margen)
+THUMB_SLOT = 220
 
 class TextOverlay(tk.Text):
-    def __init__(self, master, x, y, w, h, initial_text, original_coords, **kwargs):
+    def __init__(self, master, x, y, w, h, initial_text, original_coords, get_zoom, **kwargs):
         super().__init__(master, undo=True, wrap=tk.WORD, **kwargs)
+        self.get_zoom = get_zoom  # Nivel de zoom actual de la vista
         self.original_x = original_coords[0]  # Coordenada X original (sin zoom)
         self.original_y = original_coords[1]  # Coordenada Y original (sin zoom)
         self.original_w = original_coords[2]  # Ancho original (sin zoom)
         self.original_h = original_coords[3]  # Alto original (sin zoom)
         self.text_content = initial_text
+        self.closed = False
+        self.job = None
+        self.patch = None
+        self.source_text = None  # Texto reconocido por OCR
+        self.region_id = None    # Región del proyecto una vez terminada la traducción
         
         # Colocar con las coordenadas iniciales (ya ajustadas al zoom)
         self.place(x=x, y=y, width=w, height=h)
@@ -36,6 +44,13 @@ class TextOverlay(tk.Text):
         self.bind("<Button-3>", self.start_move)
         self.bind("<B3-Motion>", self.do_move)
         
+    def destroy(self):
+        # Cancelar el trabajo de traducción en curso, ya no hace falta
+        self.closed = True
+        if self.job:
+            self.job.cancel()
+        super().destroy()
+
     def start_move(self, event):
         self.x = event.x
         self.y = event.y
@@ -47,8 +62,8 @@ class TextOverlay(tk.Text):
         y = self.winfo_y() + deltay
         self.place(x=x, y=y)
         # Actualizar coordenadas originales cuando el usuario mueve el overlay
-        self.original_x = x / app.zoom_level
-        self.original_y = y / app.zoom_level
+        self.original_x = x / self.get_zoom()
+        self.original_y = y / self.get_zoom()
 
     def update_position(self, zoom_level):
         """Actualizar posición y tamaño según el nivel de zoom"""
@@ -64,24 +79,58 @@ class ModernTranslatorApp:
         self.root.title("VisualOCRTranslator (Alpha)")
         self.root.geometry("1400x900")
         
-        self.pages = []
-        self.thumbnails = []
+        self.page_provider = None
+        self.page_store = None
+        self.page_count = 0
+        self.current_image = None
+        self.tile_key = None
+        # Cambia con cada PDF abierto: las claves de las páginas no identifican el documento
+        self.document_serial = 0
+        self.canvas_tiles = {}  # (tx, ty) -> (id del item, PhotoImage)
+        self.refine_job = None
+        self.thumb_store = None
+        self.thumb_items = {}  # idx -> (ids de los items, PhotoImage o None si es un marcador)
+        self.thumb_pending = set()  # Miniaturas que se están preprocesando en segundo plano
+        self.thumb_generation = 0  # Cambia al redibujarlas: descarta los lotes ya obsoletos
         self.current_page = 0
         self.zoom_level = 1.0
         self.overlays = []
-        self.original_pages = []
         self.rect = None
         self.temp_overlay = None
+        self.batch_regions = []  # Regiones marcadas en la página para traducir en lote
+        self.project = None  # Traducciones guardadas del documento (documento.vot.json)
+        self.text_layer = None  # Texto incrustado del PDF, si lo tiene (evita el OCR)
+        self.speculator = None  # Traducción anticipada de las páginas siguientes
+        self.translation_session = None  # Conversación con el modelo para los globos de la página
+        self.project_save_job = None
         self.pdf_loaded = False
         
         # Configuración de preprocesamiento - todas desactivadas por defecto
-        self.preprocess_config = {
-            'enhance_contrast': False,
-            'enhance_sharpness': False,
-            'denoise': False,
-            'threshold': False,
-            'deskew': False
-        }
+        self.preprocess_config = dict(DEFAULT_PREPROCESS_CONFIG)
+        
+        # Configuración de rasterizado bajo demanda
+        self.render_config = dict(DEFAULT_RENDER_CONFIG)
+        
+        # Teselas escaladas de la página visible
+        self.tile_cache = TileCache(convert=ImageTk.PhotoImage)
+        
+        # Caché persistente de OCR y traducciones
+        try:
+            self.result_cache = ResultCache(default_cache_path())
+        except Exception as e:
+            print(f"No se pudo abrir la caché de resultados: {e}")
+            self.result_cache = None
+        
+        # OCR y traducción (API HTTP de Ollama)
+        self.ocr_config = dict(DEFAULT_OCR_CONFIG)
+        self.recognizer = TextRecognizer(self.ocr_config, cache=self.result_cache)
+        self.translation_config = dict(DEFAULT_TRANSLATION_CONFIG)
+        self.translator = Translator(self.translation_config, cache=self.result_cache)
+        self.memory_config = dict(DEFAULT_MEMORY_CONFIG)
+        self.speculative_config = dict(DEFAULT_SPECULATIVE_CONFIG)
+        
+        # Cola de trabajos de traducción (cada selección es un trabajo cancelable)
+        self.scheduler = JobScheduler(self.root, max_workers=2, on_change=self.update_job_queue)
         
         self.setup_styles()
         self.setup_ui()
@@ -107,6 +156,10 @@ class ModernTranslatorApp:
         self.close_pdf_btn = ttk.Button(top_bar, text="❌ Cerrar PDF", command=self.close_pdf, state="disabled")
         self.close_pdf_btn.pack(side=tk.LEFT, padx=5)
         
+        # Exportar el PDF traducido a partir del proyecto (inicialmente deshabilitado)
+        self.export_btn = ttk.Button(top_bar, text="💾 Exportar PDF", command=self.export_translated_pdf, state="disabled")
+        self.export_btn.pack(side=tk.LEFT, padx=5)
+        
         ttk.Separator(top_bar, orient=tk.VERTICAL).pack(side=tk.LEFT, fill=tk.Y, padx=10)
         
         center_container = ttk.Frame(top_bar)
@@ -123,15 +176,29 @@ class ModernTranslatorApp:
         ttk.Button(size_frame, text="+", width=3, command=lambda: self.adjust_font_size(1)).pack(side=tk.LEFT, padx=(2, 10))
 
         ttk.Button(center_container, text="Traducir", command=self.translate_selection).pack(side=tk.LEFT, padx=10)
+        
+        # Cola visible de trabajos; cada entrada del menú cancela su trabajo
+        ttk.Button(center_container, text="➕ Lote", command=self.add_to_batch).pack(side=tk.LEFT, padx=5)
+        self.batch_btn = ttk.Button(center_container, text="Traducir lote (0)", command=self.translate_batch)
+        self.batch_btn.pack(side=tk.LEFT, padx=5)
+        ttk.Button(center_container, text="Traducir página", command=self.translate_page).pack(side=tk.LEFT, padx=5)
+        
+        self.jobs_btn = ttk.Menubutton(center_container, text="Cola: 0")
+        self.jobs_menu = tk.Menu(self.jobs_btn, tearoff=0)
+        self.jobs_btn["menu"] = self.jobs_menu
+        self.jobs_btn.pack(side=tk.LEFT, padx=5)
+        
+        # Traducir en segundo plano las páginas siguientes mientras se lee la actual
+        self.speculative_var = tk.BooleanVar(value=self.speculative_config['enabled'])
+        ttk.Checkbutton(center_container, text="Pretraducir", variable=self.speculative_var,
+                        command=self.toggle_speculative).pack(side=tk.LEFT, padx=5)
 
         main_container = ttk.PanedWindow(self.root, orient=tk.HORIZONTAL)
         main_container.pack(fill=tk.BOTH, expand=True)
 
         self.sidebar = tk.Canvas(main_container, width=200, bg="#1a1a1a", highlightthickness=0)
         self.side_scroll = ttk.Scrollbar(main_container, orient=tk.VERTICAL, command=self.sidebar.yview)
-        self.sidebar.configure(yscrollcommand=self.side_scroll.set)
-        self.thumb_frame = tk.Frame(self.sidebar, bg="#1a1a1a")
-        self.sidebar.create_window((0,0), window=self.thumb_frame, anchor="nw")
+        self.sidebar.configure(yscrollcommand=self.on_sidebar_scroll)
         main_container.add(self.sidebar, weight=1)
 
         work_area = ttk.Frame(main_container)
@@ -144,7 +211,10 @@ class ModernTranslatorApp:
         self.canvas.bind("<ButtonRelease-1>", self.on_end_rect)
         self.canvas.bind("<Button-3>", self.clear_selection)
         self.canvas.bind("<MouseWheel>", self.on_canvas_mouse_wheel)
+        self.canvas.bind("<Configure>", lambda e: self.update_visible_tiles())
         self.sidebar.bind("<MouseWheel>", self.on_sidebar_mouse_wheel)
+        self.sidebar.bind("<Configure>", lambda e: self.update_visible_thumbnails())
+        self.sidebar.bind("<Button-1>", self.on_sidebar_click)
 
     def setup_shortcuts(self):
         self.root.bind("<Control-plus>", lambda e: self.change_zoom(0.1))
@@ -159,6 +229,7 @@ class ModernTranslatorApp:
         """Mover la vista del canvas (cámara) con las flechas del teclado"""
         self.canvas.xview_scroll(dx // 10, "units")
         self.canvas.yview_scroll(dy // 10, "units")
+        self.update_visible_tiles()
 
     # --- FUNCIONES DE PREPROCESAMIENTO ---
     def show_preprocess_dialog(self):
@@ -259,153 +330,80 @@ class ModernTranslatorApp:
         self.show_page(self.current_page)
 
     def apply_preprocessing_to_pages(self):
-        """Aplicar preprocesamiento a todas las páginas"""
-        if not self.pdf_loaded or not self.original_pages:
+        """Aplicar preprocesamiento a las miniaturas (las páginas se procesan al mostrarse)"""
+        if not self.pdf_loaded:
             return
             
-        self.pages = []
-        for img in self.original_pages:
-            processed_img = self.preprocess_image(img.copy())
-            self.pages.append(processed_img)
-        
         self.render_thumbnails()
 
     def restore_original_pages(self):
         """Restaurar páginas a su estado original"""
-        if not self.pdf_loaded or not self.original_pages:
+        if not self.pdf_loaded:
             return
             
-        self.pages = [img.copy() for img in self.original_pages]
         self.render_thumbnails()
 
-    def preprocess_image(self, image):
-        """Aplicar preprocesamiento a la imagen si hay configuraciones activas"""
-        try:
-            # Verificar si hay alguna configuración activa
-            if not any(self.preprocess_config.values()):
-                return image
-                
-            # Convertir PIL Image a numpy array para OpenCV
-            if image.mode == 'RGBA':
-                image = image.convert('RGB')
-            
-            img_cv = np.array(image)
-            img_cv = cv2.cvtColor(img_cv, cv2.COLOR_RGB2BGR)
-            
-            # Convertir a escala de grises
-            if len(img_cv.shape) == 3:
-                gray = cv2.cvtColor(img_cv, cv2.COLOR_BGR2GRAY)
-            else:
-                gray = img_cv.copy()
-            
-            # 1. Enderezar imagen (deskew)
-            if self.preprocess_config['deskew']:
-                gray = self.deskew_image(gray)
-            
-            # 2. Reducir ruido
-            if self.preprocess_config['denoise']:
-                gray = cv2.GaussianBlur(gray, (3, 3), 0)
-                gray = cv2.medianBlur(gray, 3)
-            
-            # 3. Mejorar contraste
-            if self.preprocess_config['enhance_contrast']:
-                # CLAHE (Contrast Limited Adaptive Histogram Equalization)
-                clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-                gray = clahe.apply(gray)
-                
-                # Ecualización de histograma global
-                gray = cv2.equalizeHist(gray)
-            
-            # 4. Umbralización (binarización)
-            if self.preprocess_config['threshold']:
-                # Usar método adaptativo
-                gray = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-                                           cv2.THRESH_BINARY, 11, 2)
-            
-            # 5. Mejorar nitidez
-            if self.preprocess_config['enhance_sharpness']:
-                kernel = np.array([[-1,-1,-1],
-                                 [-1, 9,-1],
-                                 [-1,-1,-1]])
-                gray = cv2.filter2D(gray, -1, kernel)
-            
-            # Convertir de vuelta a PIL Image
-            result = Image.fromarray(gray)
-            
-            # Aplicar filtros adicionales de PIL
-            if self.preprocess_config['enhance_contrast']:
-                enhancer = ImageEnhance.Contrast(result)
-                result = enhancer.enhance(1.5)
-            
-            if self.preprocess_config['enhance_sharpness']:
-                enhancer = ImageEnhance.Sharpness(result)
-                result = enhancer.enhance(2.0)
-            
-            return result
-            
-        except Exception as e:
-            print(f"Error en preprocesamiento: {e}")
-            return image  # Devolver imagen original si hay error
-
-    def deskew_image(self, image):
-        """Enderezar imagen basado en el ángulo del texto"""
-        try:
-            edges = cv2.Canny(image, 50, 150, apertureSize=3)
-            lines = cv2.HoughLinesP(edges, 1, np.pi/180, 100, minLineLength=100, maxLineGap=10)
-            
-            if lines is not None:
-                angles = []
-                for line in lines:
-                    x1, y1, x2, y2 = line[0]
-                    angle = np.arctan2(y2 - y1, x2 - x1) * 180 / np.pi
-                    if abs(angle) < 45:
-                        angles.append(angle)
-                
-                if angles:
-                    median_angle = np.median(angles)
-                    if abs(median_angle) > 0.5:
-                        (h, w) = image.shape[:2]
-                        center = (w // 2, h // 2)
-                        M = cv2.getRotationMatrix2D(center, median_angle, 1.0)
-                        image = cv2.warpAffine(image, M, (w, h), 
-                                              flags=cv2.INTER_CUBIC, 
-                                              borderMode=cv2.BORDER_REPLICATE)
-            
-            return image
-        except:
-            return image
+    def preprocess_page(self, image, config, skew_angle=None):
+        """Preprocesar una página completa informando del tiempo de cada etapa"""
+        timings = Counter()
+        result = preprocess_image(image, config, timings, skew_angle)
+        print(f"Preprocesamiento de página: {format_timings(timings)}")
+        return result
 
     def close_pdf(self):
         """Cerrar el PDF actual"""
         if not self.pdf_loaded:
             return
             
+        # Cancelar los trabajos pendientes y guardar el proyecto
+        self.scheduler.cancel_all()
+        self.stop_speculative()
+        self.end_translation_session()
+        self.save_project()
+        self.project = None
+        memory, self.translator.memory = self.translator.memory, None
+        if memory:
+            print(f"Memoria de traducción: {memory.stats()}")
+            memory.close()
+        
         # Limpiar todo
-        self.pages = []
-        self.thumbnails = []
-        self.original_pages = []
+        self.page_provider = None
+        self.page_store = None
+        self.text_layer = None
+        self.page_count = 0
+        self.current_image = None
+        if self.thumb_store:
+            self.thumb_store.stop()
+        self.thumb_store = None
+        self.thumb_items = {}
+        self.thumb_pending = set()
+        self.thumb_generation += 1
+        self.tile_cache.clear()
+        self.tile_key = None
+        self.canvas_tiles = {}
         self.overlays = []
+        self.batch_regions = []
         self.current_page = 0
         self.zoom_level = 1.0
         self.pdf_loaded = False
         
         # Limpiar interfaz
-        for widget in self.thumb_frame.winfo_children(): 
-            widget.destroy()
+        self.sidebar.delete("all")
+        self.sidebar.config(scrollregion=(0, 0, 0, 0))
         self.canvas.delete("all")
         
         # Deshabilitar botones
         self.preprocess_btn.config(state="disabled")
         self.close_pdf_btn.config(state="disabled")
+        self.export_btn.config(state="disabled")
+        self.update_batch_button()
+        
+        if self.result_cache:
+            print(f"Estadísticas de caché: {self.result_cache.stats()}")
+        self.report_skipped_translations()
         
         # Restaurar configuración de preprocesamiento a valores por defecto
-        self.preprocess_config = {
-            'enhance_contrast': False,
-            'enhance_sharpness': False,
-            'denoise': False,
-            'threshold': False,
-            'deskew': False
-        }
+        self.preprocess_config = dict(DEFAULT_PREPROCESS_CONFIG)
 
     # --- CARGA EN SEGUNDO PLANO ---
     def load_pdf(self):
@@ -418,27 +416,98 @@ class ModernTranslatorApp:
 
     def _process_pdf_thread(self, path):
         try:
-            poppler_path = r"C:\Program Files\poppler\Library\bin" if os.path.exists(r"C:\Program Files\poppler\Library\bin") else None
-            # Cargar imágenes sin preprocesamiento
-            raw_images = convert_from_path(path, poppler_path=poppler_path)
-            self.root.after(0, self._finalize_load, raw_images)
+            # Solo se rasteriza la primera página; el resto se carga bajo demanda
+            provider = PageProvider(path, poppler_path=default_poppler_path(),
+                                    dpi=self.render_config['dpi'],
+                                    prefetch=self.render_config['prefetch'],
+                                    max_cached=self.render_config['max_cached_pages'])
+            provider.get_page(0)
+            self.root.after(0, self._finalize_load, provider)
         except Exception as e:
-            self.root.after(0, lambda: messagebox.showerror("Error", f"Error: {e}"))
+            self.root.after(0, messagebox.showerror, "Error", f"Error: {e}")
             self.root.after(0, self.hide_loading_indicator)
 
-    def _finalize_load(self, raw_images):
-        # Guardar imágenes originales sin procesar
-        self.original_pages = [img.copy() for img in raw_images]
-        self.pages = [img.copy() for img in raw_images]  # Copias para mostrar
+    def _finalize_load(self, provider):
+        # Abrir otro PDF sin «Cerrar PDF»: detener y guardar antes todo lo del anterior
+        self.close_pdf()
+        self.document_serial += 1
+        self.page_provider = provider
+        self.page_store = PageStore(provider)
+        self.page_count = provider.page_count
+        self.recognizer.start_document()
+        try:
+            self.project = TranslationProject(provider.path, dpi=provider.dpi)
+        except Exception as e:
+            print(f"No se pudo abrir el proyecto de traducción: {e}")
+            self.project = None
         self.pdf_loaded = True
         
         # Habilitar botones
         self.preprocess_btn.config(state="normal")
         self.close_pdf_btn.config(state="normal")
+        if self.project:
+            self.export_btn.config(state="normal")
         
+        # Miniaturas: las ya guardadas en disco se muestran al momento, el resto se genera en segundo plano
+        try:
+            self.thumb_store = ThumbnailStore(provider)
+            self.thumb_store.start(on_ready=lambda first, last, store=self.thumb_store:
+                                   self.root.after(0, self._thumbnails_ready, store))
+        except Exception as e:
+            print(f"No se pudieron preparar las miniaturas: {e}")
+        self.sidebar.config(scrollregion=(0, 0, 200, self.page_count * THUMB_SLOT))
         self.render_thumbnails()
+        if self.speculative_var.get():
+            self.start_speculative()
         self.show_page(0)
         self.hide_loading_indicator()
+        threading.Thread(target=self._preload_model, daemon=True).start()
+        threading.Thread(target=self._load_text_layer, args=(provider,), daemon=True).start()
+        if self.memory_config['enabled']:
+            threading.Thread(target=self._load_memory, args=(provider,), daemon=True).start()
+
+    def _load_memory(self, provider):
+        """Abrir la memoria de traducción de la carpeta del PDF (compartida por la serie)"""
+        config = self.memory_config
+        try:
+            memory = TranslationMemory(memory_path(provider.path), threshold=config['threshold'],
+                                       chars_per_difference=config['chars_per_difference'],
+                                       term_min_len=config['term_min_len'], term_max_len=config['term_max_len'],
+                                       max_terms=config['max_terms'])
+        except Exception as e:
+            print(f"No se pudo abrir la memoria de traducción: {e}")
+            return
+        self.root.after(0, self._set_memory, provider, memory)
+
+    def _set_memory(self, provider, memory):
+        if provider is not self.page_provider:
+            memory.close()  # El PDF se cerró mientras se cargaba
+            return
+        self.translator.memory = memory
+
+    def _load_text_layer(self, provider):
+        """Buscar una vez por documento texto incrustado con sus cajas"""
+        start = time.perf_counter()
+        try:
+            layer = TextLayer.extract(provider.path, provider.poppler_path)
+        except Exception as e:
+            print(f"No se pudo leer el texto incrustado: {e}")
+            return
+        if layer.has_text():
+            print(f"Texto incrustado: {layer.word_count()} palabras en {time.perf_counter() - start:.2f}s; "
+                  "las selecciones con texto no pasarán por el OCR")
+            self.root.after(0, self._set_text_layer, provider, layer)
+
+    def _set_text_layer(self, provider, layer):
+        if self.page_provider is provider:
+            self.text_layer = layer
+
+    def _preload_model(self):
+        """Dejar el modelo residente antes de la primera traducción"""
+        try:
+            self.translator.client.preload()
+        except Exception as e:
+            print(f"No se pudo precargar el modelo: {e}")
 
     def show_loading_indicator(self, text="Cargando..."):
         self.loading_window = tk.Toplevel(self.root)
@@ -500,55 +569,248 @@ class ModernTranslatorApp:
             delattr(self, 'loading_dots')
 
     def render_thumbnails(self):
-        for widget in self.thumb_frame.winfo_children(): 
-            widget.destroy()
-        self.thumbnails = []
-        for i, img in enumerate(self.pages):
-            thumb = img.copy()
-            thumb.thumbnail((150, 200))
-            tk_thumb = ImageTk.PhotoImage(thumb)
-            self.thumbnails.append(tk_thumb)
-            lbl = tk.Label(self.thumb_frame, image=tk_thumb, bg="#1a1a1a", pady=10)
-            lbl.pack(fill=tk.X)
-            lbl.bind("<Button-1>", lambda e, idx=i: self.show_page(idx))
+        """Volver a dibujar las miniaturas visibles (p. ej. tras cambiar el preprocesamiento)"""
+        self.sidebar.delete("all")
+        self.thumb_items = {}
+        self.thumb_pending = set()
+        self.thumb_generation += 1
+        self.update_visible_thumbnails()
+
+    def _thumbnails_ready(self, store):
+        if store is self.thumb_store:
+            self.update_visible_thumbnails()
+
+    def update_visible_thumbnails(self, margin=2):
+        """Crear solo los items de las miniaturas que están a la vista; los demás se eliminan"""
+        if not self.thumb_store:
+            return
+        top = int(self.sidebar.canvasy(0))
+        bottom = int(self.sidebar.canvasy(self.sidebar.winfo_height()))
+        first = max(0, top // THUMB_SLOT - margin)
+        last = min(self.page_count - 1, bottom // THUMB_SLOT + margin)
+        visible = range(first, last + 1)
+
+        for idx in [idx for idx in self.thumb_items if idx not in visible]:
+            self.sidebar.delete(*self.thumb_items.pop(idx)[0])
+        self.thumb_store.request(list(visible))
+
+        # Las miniaturas recién disponibles se preprocesan juntas en un solo bloque, fuera de la interfaz
+        pending = [idx for idx in visible if self.thumb_items.get(idx, (None, None))[1] is None
+                   and idx not in self.thumb_pending and self.thumb_store.is_ready(idx)]
+        thumbs = [self.thumb_store.get(idx) for idx in pending]
+        ready = [(idx, thumb) for idx, thumb in zip(pending, thumbs) if thumb is not None]
+        if ready and any(self.preprocess_config.values()):
+            self.thumb_pending.update(idx for idx, _ in ready)
+            threading.Thread(target=self._preprocess_thumbnails,
+                             args=(self.thumb_generation, dict(self.preprocess_config), ready), daemon=True).start()
+        else:
+            for idx, thumb in ready:
+                self._place_thumbnail(idx, thumb)
+
+        # Marcador con el número de página mientras se genera la miniatura
+        for idx in visible:
+            if idx not in self.thumb_items:
+                y = idx * THUMB_SLOT + 10
+                rect = self.sidebar.create_rectangle(25, y, 175, y + 200, outline="#444", fill="#222")
+                label = self.sidebar.create_text(100, y + 100, text=str(idx + 1), fill="#777")
+                self.thumb_items[idx] = ((rect, label), None)
+
+    def on_sidebar_scroll(self, first, last):
+        self.side_scroll.set(first, last)
+        self.root.after_idle(self.update_visible_thumbnails)
+
+    def on_sidebar_click(self, event):
+        idx = int(self.sidebar.canvasy(event.y)) // THUMB_SLOT
+        if self.pdf_loaded and 0 <= idx < self.page_count:
+            self.show_page(idx)
+
+    def _place_thumbnail(self, idx, thumb):
+        """Sustituir el marcador de la página por su miniatura"""
+        if idx in self.thumb_items:
+            self.sidebar.delete(*self.thumb_items.pop(idx)[0])
+        tk_thumb = ImageTk.PhotoImage(thumb)
+        item = self.sidebar.create_image(100, idx * THUMB_SLOT + 10, image=tk_thumb, anchor="n")
+        self.thumb_items[idx] = ((item,), tk_thumb)
+
+    def _preprocess_thumbnails(self, generation, config, ready):
+        """Aplicar el preprocesamiento a un bloque de miniaturas (en una hebra aparte)"""
+        try:
+            processed, _ = preprocess_batch([thumb for _, thumb in ready], config)
+        except Exception as e:
+            print(f"Error al preprocesar las miniaturas: {e}")
+            processed = [thumb for _, thumb in ready]
+        self.root.after(0, self._thumbnails_processed, generation,
+                        [(idx, thumb) for (idx, _), thumb in zip(ready, processed)])
+
+    def _thumbnails_processed(self, generation, results):
+        if generation != self.thumb_generation:
+            return  # Se cerró el PDF o cambió el preprocesamiento mientras tanto
+        for idx, thumb in results:
+            self.thumb_pending.discard(idx)
+            # Las que salieron de la vista no tienen marcador: se procesarán si vuelven a verse
+            if idx in self.thumb_items:
+                self._place_thumbnail(idx, thumb)
 
     def show_page(self, idx):
         self.current_page = idx
+        self.end_translation_session()
+        self.translation_session = self.translator.new_session()
         
-        # Limpiar overlays de la página anterior
+        # Guardar las ediciones y limpiar overlays de la página anterior
+        self.save_project()
         for box in self.overlays: 
             box.destroy()
         self.overlays = []
+        if self.batch_regions:
+            self.batch_regions = []
+            self.update_batch_button()
         
-        # Restaurar la página desde las originales
-        if self.original_pages:
-            if any(self.preprocess_config.values()):
-                # Si hay preprocesamiento activado, aplicar a la copia original
-                original_img = self.original_pages[idx].copy()
-                processed_img = self.preprocess_image(original_img)
-                self.pages[idx] = processed_img
-            else:
-                # Si no hay preprocesamiento, usar la copia original
-                self.pages[idx] = self.original_pages[idx].copy()
+        # La página base se comparte sin copiar: el original o su variante procesada
+        if self.page_store:
+            self.page_store.clear_patches()
+            self.current_image = self.page_store.base(idx, self.preprocess_config, self.preprocess_page)
+            self.tile_key = (self.document_serial, self.page_store.base_key(idx, self.preprocess_config))
+            # Precargar (y preprocesar) las páginas vecinas en segundo plano
+            self.page_provider.prefetch_around(idx)
+            self.page_store.prefetch_processed(idx, self.preprocess_config)
+            self._restore_overlays(idx)
+            if self.speculator:
+                self.speculator.follow(idx, self.page_count)
         
         self.render_canvas_page()
 
+    # --- TRADUCCIÓN ESPECULATIVA ---
+    def toggle_speculative(self):
+        self.speculative_config['enabled'] = self.speculative_var.get()
+        if not self.pdf_loaded:
+            return
+        if self.speculative_config['enabled']:
+            self.start_speculative()
+            # Sin proyecto (no se pudo abrir) no hay dónde guardar las páginas pretraducidas
+            if self.speculator:
+                self.speculator.follow(self.current_page, self.page_count)
+        else:
+            self.stop_speculative()
+
+    def start_speculative(self):
+        """Traducir por adelantado las páginas siguientes y guardarlas en el proyecto"""
+        if self.speculator or not self.project:
+            return
+        self.speculator = SpeculativeTranslator(
+            self.page_store, self.project, self._speculative_text, self.translator,
+            on_page_ready=lambda idx: self.root.after(0, self._speculative_page_ready, idx),
+            lookahead=self.speculative_config['lookahead'],
+            max_workers=self.speculative_config['max_workers'])
+        # Cede el paso si ya hay trabajos interactivos en cola
+        if self.scheduler.jobs():
+            self.speculator.pause()
+
+    def stop_speculative(self):
+        if self.speculator:
+            self.speculator.stop()
+            if self.speculator.pages_done:
+                print(f"Traducción especulativa: {self.speculator.pages_done} páginas traducidas por adelantado")
+            self.speculator = None
+
+    def _speculative_text(self, page_store, idx, box):
+        """Texto de una región de otra página: capa de texto o OCR a la resolución de OCR
+
+        Se llama desde las hebras del traductor especulativo con el documento que está
+        traduciendo, que puede no ser ya el abierto.
+        """
+        source = (page_store.provider, idx, box, page_store.original(idx), 0)
+        text = self._embedded_text(source)
+        if text:
+            return text
+        result = self.recognizer.analyze(self._ocr_crop(source), self.preprocess_config)
+        return "" if result.dropped else result.text
+
+    def _speculative_page_ready(self, idx):
+        """Guardar la página pretraducida y mostrarla si el usuario ya está en ella"""
+        self.schedule_project_save()
+        if idx == self.current_page and self.pdf_loaded and not self.overlays:
+            self._restore_overlays(idx)
+            self.render_canvas_page()
+
+    def end_translation_session(self):
+        """Informar de los tokens de prompt reutilizados en la sesión de la página"""
+        if self.translation_session and self.translation_session.requests:
+            print(self.translation_session.summary())
+        self.translation_session = None
+
+    def _restore_overlays(self, idx):
+        """Volver a mostrar las traducciones guardadas de la página sin repetir OCR ni traducción"""
+        if not self.project:
+            return
+        for region in self.project.regions(idx):
+            fill = tuple(region["fill"]) if isinstance(region["fill"], list) else region["fill"]
+            overlay = self._add_overlay(tuple(region["box"]), fill, region["translation"],
+                                        position=region.get("position"))
+            overlay.source_text = region["text"]
+            overlay.region_id = region["id"]
+
     def render_canvas_page(self):
-        if not self.pages: 
+        if self.current_image is None: 
             return
-        img = self.pages[self.current_page]
-        new_size = (int(img.width * self.zoom_level), int(img.height * self.zoom_level))
-        resized = img.resize(new_size, Image.Resampling.LANCZOS)
-        self.tk_current_page = ImageTk.PhotoImage(resized)
+        img = self.current_image
         self.canvas.delete("all")
-        self.canvas.create_image(0, 0, image=self.tk_current_page, anchor="nw")
-        self.canvas.config(scrollregion=self.canvas.bbox("all"))
+        self.canvas_tiles = {}
+        self.canvas.config(scrollregion=(0, 0, int(img.width * self.zoom_level), int(img.height * self.zoom_level)))
+        # Solo se remuestrean las teselas visibles, con el filtro rápido
+        self.update_visible_tiles()
+        # Los parches de traducción son rectángulos del canvas: no obligan a remuestrear la página
+        self._draw_patches()
+        self._draw_batch_regions()
         
         self.update_overlays_position()
 
+    def update_visible_tiles(self, quality=FAST):
+        """Dibujar las teselas que caen dentro del viewport del canvas"""
+        if self.current_image is None:
+            return
+        img = self.current_image
+        viewport = (self.canvas.canvasx(0), self.canvas.canvasy(0),
+                    self.canvas.canvasx(self.canvas.winfo_width()), self.canvas.canvasy(self.canvas.winfo_height()))
+        needs_refine = False
+        for tx, ty, x, y in self.tile_cache.visible_tiles(img.width, img.height, self.zoom_level, viewport):
+            if quality == FAST and not self.tile_cache.has(self.tile_key, self.zoom_level, tx, ty, HIGH_QUALITY):
+                needs_refine = True
+            photo = self.tile_cache.get(img, self.tile_key, self.zoom_level, tx, ty, quality)
+            entry = self.canvas_tiles.get((tx, ty))
+            if entry:
+                if entry[1] is not photo:
+                    self.canvas.itemconfig(entry[0], image=photo)
+                item = entry[0]
+            else:
+                item = self.canvas.create_image(x, y, image=photo, anchor="nw", tags="tile")
+                self.canvas.tag_lower(item)
+            # La referencia evita que Tk libere una tesela expulsada de la caché mientras se ve
+            self.canvas_tiles[(tx, ty)] = (item, photo)
+        
+        # Refinar con LANCZOS cuando la vista lleve un momento quieta
+        if self.refine_job:
+            self.root.after_cancel(self.refine_job)
+            self.refine_job = None
+        if needs_refine:
+            self.refine_job = self.root.after(250, self._refine_visible_tiles)
+
+    def _refine_visible_tiles(self):
+        self.refine_job = None
+        self.update_visible_tiles(HIGH_QUALITY)
+
+    def _draw_patches(self):
+        for (x1, y1, x2, y2), fill in self.page_store.patches(self.current_page):
+            if isinstance(fill, int):
+                fill = (fill, fill, fill)
+            color = "#%02x%02x%02x" % tuple(fill[:3])
+            self.canvas.create_rectangle(x1 * self.zoom_level, y1 * self.zoom_level,
+                                         x2 * self.zoom_level, y2 * self.zoom_level,
+                                         fill=color, outline="", tags="patch")
+
     def change_zoom(self, delta):
         old_zoom = self.zoom_level
-        self.zoom_level = max(0.2, min(3.0, self.zoom_level + delta))
+        # Redondeado para que cada nivel de zoom tenga una clave estable en la caché de teselas
+        self.zoom_level = round(max(0.2, min(3.0, self.zoom_level + delta)), 2)
         if old_zoom != self.zoom_level:
             self.render_canvas_page()
 
@@ -559,7 +821,7 @@ class ModernTranslatorApp:
     def on_canvas_mouse_wheel(self, event):
         if event.delta > 0 and self.current_page > 0: 
             self.show_page(self.current_page - 1)
-        elif event.delta < 0 and self.current_page < len(self.pages) - 1: 
+        elif event.delta < 0 and self.current_page < self.page_count - 1: 
             self.show_page(self.current_page + 1)
 
     def on_sidebar_mouse_wheel(self, event):
@@ -578,9 +840,10 @@ class ModernTranslatorApp:
             box.configure(font=("Inter", int(self.font_size_var.get())))
 
     # --- TRADUCCIÓN ASÍNCRONA ---
-    def translate_selection(self):
-        if not hasattr(self, 'rect') or not self.pages: 
-            return
+    def _selection_box(self):
+        """Convertir la selección actual a coordenadas de página (sin zoom) validadas"""
+        if not hasattr(self, 'rect') or not hasattr(self, 'end_x') or self.current_image is None: 
+            return None
         
         x1 = min(self.start_x, self.end_x) / self.zoom_level
         y1 = min(self.start_y, self.end_y) / self.zoom_level
@@ -589,9 +852,9 @@ class ModernTranslatorApp:
         
         if x2 - x1 < 1 or y2 - y1 < 1:
             messagebox.showwarning("Advertencia", "Selección demasiado pequeña")
-            return
+            return None
         
-        img_width, img_height = self.pages[self.current_page].size
+        img_width, img_height = self.current_image.size
         x1 = max(0, min(x1, img_width - 1))
         y1 = max(0, min(y1, img_height - 1))
         x2 = max(0, min(x2, img_width))
@@ -599,79 +862,253 @@ class ModernTranslatorApp:
         
         if x2 <= x1 or y2 <= y1:
             messagebox.showwarning("Advertencia", "Selección inválida")
+            return None
+        
+        return int(x1), int(y1), int(x2), int(y2)
+
+    def translate_selection(self):
+        box = self._selection_box()
+        if box is None:
             return
         
         try:
-            x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
-            crop = self.pages[self.current_page].crop((x1, y1, x2, y2))
+            x1, y1, x2, y2 = box
+            crop = self.current_image.crop((x1, y1, x2, y2))
             
             if crop.width == 0 or crop.height == 0:
                 messagebox.showwarning("Advertencia", "Área de selección vacía")
                 return
             
-            # Aplicar preprocesamiento solo al área seleccionada si hay configuraciones activas
-            if any(self.preprocess_config.values()):
-                crop = self.preprocess_image(crop)
-            
-            # Configuración de OCR
-            config = '--psm 6 --oem 3 -c preserve_interword_spaces=1'
-            text_jp = pytesseract.image_to_string(crop, lang='jpn', config=config)
-            text_jp = text_jp.replace(" ", "").replace("\n", "")
-            
-            if not text_jp.strip():
-                for psm in [1, 3, 4, 6, 7, 8, 11, 12]:
-                    config = f'--psm {psm} --oem 3'
-                    text_jp = pytesseract.image_to_string(crop, lang='jpn', config=config)
-                    text_jp = text_jp.replace(" ", "").replace("\n", "")
-                    if text_jp.strip():
-                        break
-                
-                if not text_jp.strip():
-                    messagebox.showwarning("Advertencia", "No se detectó texto en la selección")
-                    return
-                
-            self.show_loading_indicator("Traduciendo...")
-            threading.Thread(target=self._async_translate, args=(text_jp, x1, y1, x2, y2, crop), daemon=True).start()
+            # El overlay se crea ya; la re-rasterización, el OCR y la traducción corren en la cola de trabajos
+            overlay = self._create_translation_overlay(x1, y1, x2, y2, crop)
+            overlay.job = self.scheduler.submit(f"Pág. {self.current_page + 1} ({x1}, {y1})",
+                                                self._translation_job, self._region_source(box), overlay)
             
         except Exception as e:
             messagebox.showerror("Error", f"Error al procesar la imagen: {str(e)}")
             return
 
-    def _async_translate(self, text, x1, y1, x2, y2, crop):
-        try:
-            prompt = f"Traduce este texto del japonés al español, no digas nada, no pongas notas, no expliques nada. solo pasalo al español con un tono natural y precisa: {text}"
-            res = subprocess.run(['ollama', 'run', 'qwen2.5:3b', prompt], 
-                                capture_output=True, text=True, encoding='utf-8', timeout=40)
-            translation = res.stdout.strip() if res.returncode == 0 else "Error en IA"
-            self.root.after(0, self._apply_translation, translation, x1, y1, x2, y2, crop)
-        except subprocess.TimeoutExpired:
-            self.root.after(0, lambda: messagebox.showerror("Error", "Tiempo de espera agotado"))
-            self.root.after(0, self.hide_loading_indicator)
-        except Exception as e:
-            self.root.after(0, lambda: self.hide_loading_indicator())
-            self.root.after(0, lambda: messagebox.showerror("Error", f"Error de traducción: {e}"))
+    # --- TRADUCCIÓN POR LOTES ---
+    def add_to_batch(self):
+        """Añadir la selección actual al lote de la página"""
+        box = self._selection_box()
+        if box is None:
+            return
+        self.batch_regions.append(box)
+        self.clear_selection(None)
+        self.render_canvas_page()
+        self.update_batch_button()
 
-    def _apply_translation(self, text_es, x1, y1, x2, y2, crop):
-        draw = ImageDraw.Draw(self.pages[self.current_page])
-        draw.rectangle([x1, y1, x2, y2], fill=crop.resize((1,1)).getpixel((0,0)))
+    def update_batch_button(self):
+        self.batch_btn.config(text=f"Traducir lote ({len(self.batch_regions)})")
+
+    def _draw_batch_regions(self):
+        for x1, y1, x2, y2 in self.batch_regions:
+            self.canvas.create_rectangle(x1 * self.zoom_level, y1 * self.zoom_level,
+                                         x2 * self.zoom_level, y2 * self.zoom_level,
+                                         outline="#FF69B4", width=2, dash=(4, 2))
+
+    def translate_batch(self):
+        """Traducir todas las regiones del lote con una sola petición al modelo"""
+        if not self.batch_regions or self.current_image is None:
+            return
+        regions, self.batch_regions = self.batch_regions, []
+        self.update_batch_button()
         
-        original_coords = (x1, y1, x2-x1, y2-y1)
+        items = []
+        for x1, y1, x2, y2 in regions:
+            crop = self.current_image.crop((x1, y1, x2, y2))
+            items.append((self._region_source((x1, y1, x2, y2)), self._create_translation_overlay(x1, y1, x2, y2, crop)))
+        job = self.scheduler.submit(f"Pág. {self.current_page + 1}: lote de {len(items)}",
+                                    self._batch_translation_job, items)
+        for _, overlay in items:
+            overlay.job = job
+
+    def translate_page(self):
+        """Detectar automáticamente el texto de la página y traducirlo en lote"""
+        if not self.page_store:
+            return
+        idx = self.current_page
+        self.scheduler.submit(f"Pág. {idx + 1}: detección de texto", self._detect_regions_job, idx)
+
+    def _detect_regions_job(self, job, idx):
+        self.scheduler.set_state(job, "detectando")
+        start = time.perf_counter()
+        regions = self.page_store.regions(idx, detect_text_regions)
+        print(f"Detección: {len(regions)} regiones en la página {idx + 1} ({time.perf_counter() - start:.2f}s)")
+        if not job.cancelled:
+            self.scheduler.call_in_ui(self._translate_detected_regions, idx, regions)
+
+    def _translate_detected_regions(self, idx, regions):
+        if idx != self.current_page or not self.page_store:
+            return  # El usuario cambió de página mientras se detectaba
+        if not regions:
+            messagebox.showwarning("Advertencia", "No se detectó texto en la página")
+            return
+        self.batch_regions = list(regions)
+        self.translate_batch()
+
+    def _batch_translation_job(self, job, items):
+        """OCR de cada región y traducción conjunta en una sola petición"""
+        texts = []
+        for source, overlay in items:
+            if job.cancelled:
+                break
+            self.scheduler.set_state(job, f"OCR {len(texts) + 1}/{len(items)}")
+            try:
+                texts.append(self._embedded_text(source) or
+                             self.recognizer.recognize(self._ocr_crop(source), self.preprocess_config))
+            except Exception as e:
+                print(f"Error de OCR en el lote: {e}")
+                texts.append("")
         
-        current_x = x1 * self.zoom_level
-        current_y = y1 * self.zoom_level
-        current_w = (x2 - x1) * self.zoom_level
-        current_h = (y2 - y1) * self.zoom_level
+        pending = []
+        for (source, overlay), text in zip(items, texts):
+            if text.strip():
+                pending.append((overlay, text))
+            else:
+                self.scheduler.call_in_ui(self._discard_overlay, overlay)
+        if job.cancelled or not pending:
+            for source, overlay in items:
+                self.scheduler.call_in_ui(self._discard_overlay, overlay)
+            return
         
-        new_box = TextOverlay(self.canvas, 
-                             x=current_x, 
-                             y=current_y, 
-                             w=current_w, 
-                             h=current_h,
-                             initial_text=text_es, 
-                             original_coords=original_coords,
-                             font=("Inter", int(self.font_size_var.get())),
-                             bg="white", fg="black", bd=0)
-        self.overlays.append(new_box)
+        self.scheduler.set_state(job, "traduciendo")
+        try:
+            translations = self.translator.translate_texts([text for _, text in pending],
+                                                           cancelled=lambda: job.cancelled)
+        except TimeoutError:
+            translations = None
+            self.scheduler.call_in_ui(lambda: messagebox.showerror("Error", "Tiempo de espera agotado"))
+        except Exception as e:
+            translations = None
+            self.scheduler.call_in_ui(messagebox.showerror, "Error", f"Error de traducción: {e}")
+        if translations is None or job.cancelled:
+            for overlay, _ in pending:
+                self.scheduler.call_in_ui(self._discard_overlay, overlay)
+            return
+        for (overlay, text), translation in zip(pending, translations):
+            self.scheduler.call_in_ui(self._append_translation, overlay, translation or "Error en IA", True)
+            if translation:
+                self.scheduler.call_in_ui(self._record_overlay, overlay, text)
+
+    def _region_source(self, box):
+        """Lo necesario para obtener el recorte de OCR desde una hebra de trabajo
+
+        Con «Enderezar» la vista está girada respecto al PDF: se guarda el ángulo aplicado.
+        """
+        idx = self.current_page
+        angle = self.page_store.skew_angle(idx) if self.preprocess_config['deskew'] else 0
+        return self.page_provider, idx, box, self.current_image, angle
+
+    def _ocr_crop(self, source):
+        """Re-rasterizar solo la región a la resolución de OCR; si falla, recortar la página de la vista"""
+        provider, idx, box, image, angle = source
+        try:
+            return provider.render_region(idx, box, self.render_config['ocr_dpi'], angle)
+        except Exception as e:
+            print(f"No se pudo re-rasterizar la región a {self.render_config['ocr_dpi']} ppp: {e}")
+            return image.crop(box)
+
+    def _embedded_text(self, source):
+        """Texto incrustado del PDF dentro de la región ("" si no hay y hace falta OCR)"""
+        provider, idx, box, image, angle = source
+        layer = self.text_layer
+        if not layer or provider is not self.page_provider or not layer.has_text(idx):
+            return ""
+        start = time.perf_counter()
+        text = layer.text_in(idx, unrotate_box(box, angle, image.size), provider.dpi)
+        if text:
+            print(f"Texto incrustado: {len(text)} caracteres en {(time.perf_counter() - start) * 1000:.2f} ms (sin OCR)")
+        return text
+
+    def _translation_job(self, job, source, overlay):
+        """Re-rasterizar, preprocesar, hacer OCR y traducir una región (en una hebra del pool)"""
+        if job.cancelled:
+            self.scheduler.call_in_ui(self._discard_overlay, overlay)
+            return
+        self.scheduler.set_state(job, "OCR")
+        try:
+            text_jp = self._embedded_text(source)
+            result = None if text_jp else self.recognizer.analyze(self._ocr_crop(source), self.preprocess_config)
+            if result:
+                text_jp = result.text
+        except Exception as e:
+            self.scheduler.call_in_ui(self._discard_overlay, overlay)
+            self.scheduler.call_in_ui(messagebox.showerror, "Error", f"Error al procesar la imagen: {str(e)}")
+            return
+        if job.cancelled:
+            self.scheduler.call_in_ui(self._discard_overlay, overlay)
+            return
+        if result and result.dropped:
+            self.scheduler.call_in_ui(self._discard_overlay, overlay)
+            self.scheduler.call_in_ui(messagebox.showwarning, "Advertencia",
+                                      f"El texto reconocido es de baja calidad ({result.quality:.0f}/100) "
+                                      "y no se envía a traducir")
+            self.report_skipped_translations()
+            return
+        if not text_jp.strip():
+            self.scheduler.call_in_ui(self._discard_overlay, overlay)
+            self.scheduler.call_in_ui(messagebox.showwarning, "Advertencia", "No se detectó texto en la selección")
+            return
+        
+        self.scheduler.set_state(job, "traduciendo")
+        self._async_translate(text_jp, overlay, job)
+        if job.cancelled:
+            self.scheduler.call_in_ui(self._discard_overlay, overlay)
+
+    def report_skipped_translations(self):
+        """Informar de las llamadas al modelo evitadas por OCR de baja calidad y del tiempo estimado"""
+        skipped = self.recognizer.skipped
+        if not skipped:
+            return
+        latency = self.translator.average_latency()
+        saved = f", ~{skipped * latency:.1f}s ahorrados" if latency else ""
+        print(f"Traducciones evitadas por baja calidad del OCR: {skipped}{saved}")
+
+    def update_job_queue(self):
+        """Refrescar la cola visible de trabajos"""
+        jobs = self.scheduler.jobs()
+        self.jobs_btn.config(text=f"Cola: {len(jobs)}")
+        # El trabajo interactivo tiene prioridad sobre la traducción especulativa
+        if self.speculator:
+            if jobs:
+                self.speculator.pause()
+            else:
+                self.speculator.resume()
+        self.jobs_menu.delete(0, tk.END)
+        for job in jobs:
+            self.jobs_menu.add_command(label=f"✕ {job.description} — {job.state}",
+                                       command=lambda job_id=job.id: self.scheduler.cancel(job_id))
+        if jobs:
+            self.jobs_menu.add_separator()
+            self.jobs_menu.add_command(label="Cancelar todo", command=self.scheduler.cancel_all)
+
+    def _async_translate(self, text, overlay, job):
+        try:
+            received = False
+            stream = self.translator.stream(text, self.translation_session)
+            for chunk in stream:
+                if job.cancelled:
+                    stream.close()  # Trabajo cancelado u overlay destruido: cortar la generación
+                    break
+                self.root.after(0, self._append_translation, overlay, chunk, not received)
+                received = True
+            if not received and not job.cancelled:
+                self.root.after(0, self._append_translation, overlay, "Error en IA", True)
+            elif not job.cancelled:
+                self.root.after(0, self._record_overlay, overlay, text)
+        except TimeoutError:
+            # Sin traducción el marcador «…» y su parche no deben seguir tapando el bocadillo
+            self.scheduler.call_in_ui(self._discard_overlay, overlay)
+            self.root.after(0, lambda: messagebox.showerror("Error", "Tiempo de espera agotado"))
+        except Exception as e:
+            self.scheduler.call_in_ui(self._discard_overlay, overlay)
+            self.root.after(0, messagebox.showerror, "Error", f"Error de traducción: {e}")
+
+    def _create_translation_overlay(self, x1, y1, x2, y2, crop):
+        fill = crop.resize((1,1)).getpixel((0,0))
+        new_box = self._add_overlay((x1, y1, x2, y2), fill, "…")
         
         if self.rect:
             self.canvas.delete(self.rect)
@@ -681,7 +1118,117 @@ class ModernTranslatorApp:
             self.temp_overlay = None
             
         self.render_canvas_page()
-        self.hide_loading_indicator()
+        return new_box
+
+    def _add_overlay(self, box, fill, text, position=None):
+        """Tapar la región de la página y colocar encima un overlay editable"""
+        x1, y1, x2, y2 = box
+        self.page_store.add_patch(self.current_page, box, fill)
+        
+        original_coords = tuple(position) if position else (x1, y1, x2-x1, y2-y1)
+        ox, oy, ow, oh = original_coords
+        
+        new_box = TextOverlay(self.canvas, 
+                             x=ox * self.zoom_level, 
+                             y=oy * self.zoom_level, 
+                             w=ow * self.zoom_level, 
+                             h=oh * self.zoom_level,
+                             initial_text=text, 
+                             original_coords=original_coords,
+                             get_zoom=lambda: self.zoom_level,
+                             font=("Inter", int(self.font_size_var.get())),
+                             bg="white", fg="black", bd=0)
+        new_box.patch = (self.current_page, box, fill)
+        # Las ediciones y los movimientos se guardan en el proyecto
+        new_box.bind("<KeyRelease>", lambda e: self.schedule_project_save(), add="+")
+        new_box.bind("<ButtonRelease-3>", lambda e: self.schedule_project_save(), add="+")
+        self.overlays.append(new_box)
+        return new_box
+
+    def _record_overlay(self, overlay, text):
+        """Guardar en el proyecto la traducción terminada de un overlay"""
+        if not self.project or overlay.closed or not overlay.patch:
+            return
+        page, box, fill = overlay.patch
+        overlay.source_text = text
+        size = (self.current_image.width, self.current_image.height) if self.current_image else None
+        overlay.region_id = self.project.add_region(
+            page, box, text, fill, overlay.get("1.0", "end-1c"),
+            position=(overlay.original_x, overlay.original_y, overlay.original_w, overlay.original_h),
+            size=size)
+        self.schedule_project_save()
+
+    def schedule_project_save(self, delay=1000):
+        """Agrupar las escrituras del proyecto mientras el usuario edita"""
+        if self.project_save_job:
+            self.root.after_cancel(self.project_save_job)
+        self.project_save_job = self.root.after(delay, self.save_project)
+
+    def save_project(self):
+        """Volcar al proyecto el texto y la posición actuales de los overlays y escribirlo"""
+        if self.project_save_job:
+            self.root.after_cancel(self.project_save_job)
+            self.project_save_job = None
+        if not self.project:
+            return
+        for overlay in self.overlays:
+            if overlay.region_id and not overlay.closed and overlay.patch:
+                translation = overlay.get("1.0", "end-1c")
+                self.project.update_region(
+                    overlay.patch[0], overlay.region_id, translation=translation,
+                    position=[overlay.original_x, overlay.original_y, overlay.original_w, overlay.original_h])
+                # Las correcciones del usuario sustituyen a la traducción del modelo en la memoria
+                if self.translator.memory and overlay.source_text:
+                    self.translator.memory.add(overlay.source_text, translation)
+        try:
+            self.project.save()
+        except OSError as e:
+            print(f"No se pudo guardar el proyecto: {e}")
+
+    def export_translated_pdf(self):
+        """Exportar el documento con las traducciones guardadas como texto real"""
+        if not self.project or not self.page_provider:
+            return
+        out_path = filedialog.asksaveasfilename(defaultextension=".pdf", filetypes=[("PDF Files", "*.pdf")])
+        if not out_path:
+            return
+        ocr_layer = messagebox.askyesno("Exportar PDF", "¿Añadir el texto japonés como capa invisible de búsqueda?")
+        self.save_project()
+        provider = self.page_provider
+        self.scheduler.submit(f"Exportar {os.path.basename(out_path)}", self._export_job,
+                              provider, self.project.results(), out_path, ocr_layer)
+
+    def _export_job(self, job, provider, results, out_path, ocr_layer):
+        if job.cancelled:
+            return
+        try:
+            export_pdf(provider.path, results, out_path, dpi=provider.dpi, poppler_path=provider.poppler_path,
+                       ocr_layer=ocr_layer, raster_dpi=self.render_config['export_dpi'],
+                       progress=lambda done, total: self.scheduler.set_state(job, f"página {done}/{total}"))
+        except Exception as e:
+            self.scheduler.call_in_ui(messagebox.showerror, "Error", f"Error al exportar: {e}")
+            return
+        self.scheduler.call_in_ui(messagebox.showinfo, "Exportar PDF", f"PDF guardado en {out_path}")
+
+    def _discard_overlay(self, overlay):
+        """Quitar un overlay cuyo trabajo se canceló, falló o no produjo texto"""
+        if overlay.closed:
+            return
+        if overlay in self.overlays:
+            self.overlays.remove(overlay)
+        overlay.destroy()
+        if overlay.patch and self.page_store:
+            self.page_store.remove_patch(*overlay.patch)
+        self.render_canvas_page()
+
+    def _append_translation(self, overlay, chunk, first):
+        """Añadir un fragmento de la traducción al overlay (en la hebra de Tk)"""
+        if overlay.closed or not overlay.winfo_exists():
+            return
+        if first:
+            overlay.delete("1.0", tk.END)  # Quitar el marcador "…"
+        overlay.insert("end-1c", chunk)
+        overlay.text_content = overlay.get("1.0", "end-1c")
 
     def on_start_rect(self, e):
         self.start_x, self.start_y = self.canvas.canvasx(e.x), self.canvas.canvasy(e.y)
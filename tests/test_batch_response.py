@@ -0,0 +1,26 @@
+"""Translator.parse_batch_response con respuestas reales y defectuosas del modelo"""
+import pytest
+
+from visualocrtranslator.translation import Translator
+
+
+@pytest.mark.parametrize("response, expected", [
+    ('["Hola", "Adiós"]', ["Hola", "Adiós"]),
+    ('Aquí tienes la traducción:\n```json\n["¡Vamos!", "No [puede] ser"]\n```', ["¡Vamos!", "No [puede] ser"]),
+    ('[\n  "Sí",\n  ""\n]', ["Sí", ""]),
+])
+def test_valid_arrays(response, expected):
+    assert Translator.parse_batch_response(response, len(expected)) == expected
+
+
+@pytest.mark.parametrize("response", [
+    "Hola, Adiós",                    # Sin array
+    '["Hola", "Adiós"',               # Array sin cerrar
+    '["Hola"]',                        # Faltan elementos
+    '["Hola", "Adiós", "Extra"]',      # Sobran elementos
+    '["Hola", 2]',                     # Elementos que no son cadenas
+    '{"a": "Hola", "b": "Adiós"}',     # Objeto en lugar de array
+    "] Hola [",                        # Corchetes invertidos
+])
+def test_invalid_responses_return_none(response):
+    assert Translator.parse_batch_response(response, 2) is None
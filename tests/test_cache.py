@@ -0,0 +1,64 @@
+"""ResultCache: persistencia, estadísticas y expulsión LRU por tipo"""
+import itertools
+
+import pytest
+from PIL import Image
+
+from visualocrtranslator import cache as cache_module
+from visualocrtranslator.cache import ResultCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Reloj que avanza un segundo por llamada: el orden de acceso no depende de la resolución de time.time"""
+    ticks = itertools.count(1000)
+    monkeypatch.setattr(cache_module.time, "time", lambda: float(next(ticks)))
+
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    cache = ResultCache(str(tmp_path / "cache.sqlite3"), max_entries=10)
+    yield cache
+    cache.close()
+
+
+def test_values_persist_and_kinds_are_separate(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = ResultCache(path)
+    cache.put("ocr", "k", "テキスト")
+    cache.close()
+    reopened = ResultCache(path)
+    try:
+        assert reopened.get("ocr", "k") == "テキスト"
+        assert reopened.get("translation", "k") is None
+        assert reopened.stats() == {"ocr": {"hits": 1, "misses": 0}, "translation": {"hits": 0, "misses": 1}}
+    finally:
+        reopened.close()
+
+
+def test_eviction_removes_least_recently_used_with_slack(cache):
+    for i in range(10):
+        cache.put("ocr", f"k{i}", str(i))
+    # Leer k0 y k1 los convierte en los más recientes
+    assert cache.get("ocr", "k0") == "0" and cache.get("ocr", "k1") == "1"
+    cache.put("ocr", "k10", "10")
+    # 11 entradas con límite 10: se expulsan 1 + un 10% extra, las menos usadas (k2 y k3)
+    remaining = {f"k{i}" for i in range(11) if cache.get("ocr", f"k{i}") is not None}
+    assert remaining == {"k0", "k1", "k4", "k5", "k6", "k7", "k8", "k9", "k10"}
+
+
+def test_eviction_is_per_kind(cache):
+    for i in range(10):
+        cache.put("translation", f"t{i}", str(i))
+    for i in range(11):
+        cache.put("ocr", f"k{i}", str(i))
+    assert all(cache.get("translation", f"t{i}") == str(i) for i in range(10))
+
+
+def test_ocr_key_depends_on_pixels_and_config():
+    white, black = Image.new("L", (4, 4), 255), Image.new("L", (4, 4), 0)
+    key = ResultCache.ocr_key(white, {"threshold": False}, "jpn", [6])
+    assert key == ResultCache.ocr_key(white.copy(), {"threshold": False}, "jpn", [6])
+    assert key != ResultCache.ocr_key(black, {"threshold": False}, "jpn", [6])
+    assert key != ResultCache.ocr_key(white, {"threshold": True}, "jpn", [6])
+    assert key != ResultCache.ocr_key(white, {"threshold": False}, "jpn_vert", [6])
@@ -0,0 +1,81 @@
+"""TranslationMemory: coincidencias exactas y aproximadas, glosario y persistencia"""
+import pytest
+
+from visualocrtranslator.memory import TranslationMemory, glossary_term
+
+LONG = "俺たちはこの町を守るために戦ってきたんだ、今さら逃げるわけにはいかない"
+# El mismo globo con un carácter mal leído por el OCR
+LONG_NOISY = LONG.replace("戦", "載")
+
+
+@pytest.fixture
+def memory(tmp_path):
+    memory = TranslationMemory(str(tmp_path / "memoria.sqlite3"))
+    yield memory
+    memory.close()
+
+
+def test_exact_lookup_ignores_ocr_spaces(memory):
+    memory.add("お前のせいじゃない", "No es tu culpa")
+    match = memory.lookup("お前の せいじゃ ない")
+    assert match.target == "No es tu culpa" and match.score == 1.0
+
+
+def test_long_line_with_ocr_noise_is_served(memory):
+    memory.add(LONG, "Hemos luchado para proteger este pueblo")
+    match = memory.lookup(LONG_NOISY)
+    assert match is not None and match.source == LONG
+    assert 0.9 <= match.score < 1
+
+
+def test_short_line_must_match_exactly(memory):
+    memory.add("お前のせいじゃない", "No es tu culpa")
+    assert memory.lookup("お前のせいじゃないか") is None
+    assert memory.stats()["misses"] == 1
+
+
+def test_correction_replaces_translation(memory):
+    memory.add("ナルト", "Naruto")
+    memory.add("ナルト", "¡Naruto!")
+    assert memory.lookup("ナルト").target == "¡Naruto!"
+    assert len(memory) == 1
+
+
+@pytest.mark.parametrize("source", ["はい", "ない", "いいよ", "ちょっと", "ね"])
+def test_hiragana_and_short_entries_are_not_terms(source):
+    assert glossary_term(source, "Sí") is None
+
+
+def test_terms_drop_edge_punctuation():
+    assert glossary_term("「ナルト」！", "«¡Naruto!»") == ("ナルト", "Naruto")
+    assert glossary_term("木ノ葉の里", "la Aldea de la Hoja") == ("木ノ葉の里", "la Aldea de la Hoja")
+
+
+def test_glossary_skips_particles(memory):
+    memory.add("はい", "Sí")
+    memory.add("ない", "No")
+    memory.add("「ナルト」", "«Naruto»")
+    assert memory.glossary("入ってはいけない") == []
+    assert memory.glossary("ナルトはいない") == [("ナルト", "Naruto")]
+
+
+def test_glossary_prefers_longest_terms(memory):
+    memory.add("木ノ葉", "Hoja")
+    memory.add("木ノ葉の里", "la Aldea de la Hoja")
+    assert memory.glossary("木ノ葉の里に帰るぞ") == [("木ノ葉の里", "la Aldea de la Hoja")]
+
+
+def test_memory_persists_between_sessions(tmp_path):
+    path = str(tmp_path / "memoria.sqlite3")
+    memory = TranslationMemory(path)
+    memory.add(LONG, "Hemos luchado para proteger este pueblo")
+    memory.add("ナルト", "Naruto")
+    memory.close()
+
+    reopened = TranslationMemory(path)
+    try:
+        assert len(reopened) == 2
+        assert reopened.lookup(LONG_NOISY).source == LONG
+        assert reopened.glossary("ナルトが来た") == [("ナルト", "Naruto")]
+    finally:
+        reopened.close()
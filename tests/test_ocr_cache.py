@@ -0,0 +1,64 @@
+"""Caché de OCR de TextRecognizer con un motor falso (sin Tesseract)"""
+import pytest
+from PIL import Image
+
+from visualocrtranslator.cache import ResultCache
+from visualocrtranslator.ocr import DEFAULT_OCR_CONFIG, TextRecognizer
+
+
+class FakeBackend:
+    name = "falso"
+
+    def __init__(self, text, confidence):
+        self.text = text
+        self.confidence = confidence
+        self.calls = []
+
+    def image_to_data(self, image, psm, extra_config, lang):
+        self.calls.append((psm, extra_config, lang))
+        return self.text, self.confidence
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache.sqlite3"))
+    yield cache
+    cache.close()
+
+
+def _recognizer(cache, text, confidence):
+    config = dict(DEFAULT_OCR_CONFIG, backend="pytesseract", orientation="horizontal")
+    recognizer = TextRecognizer(config, cache, verbose=False)
+    recognizer.backend = FakeBackend(text, confidence)
+    return recognizer
+
+
+def test_accepted_result_is_served_from_cache(cache):
+    recognizer = _recognizer(cache, "行くぞ", 90)
+    crop = Image.new("L", (40, 20), 255)
+    first = recognizer.analyze(crop, {})
+    calls = len(recognizer.backend.calls)
+    again = recognizer.analyze(crop, {})
+    assert again == first and first.text == "行くぞ" and not first.dropped
+    assert len(recognizer.backend.calls) == calls
+
+
+def test_dropped_result_stays_dropped_from_cache(cache):
+    recognizer = _recognizer(cache, "は|~;", 40)
+    crop = Image.new("L", (40, 20), 255)
+    first = recognizer.analyze(crop, {})
+    assert first.dropped and first.text == ""
+    calls = len(recognizer.backend.calls)
+    again = recognizer.analyze(crop, {})
+    assert again.dropped and again.quality == first.quality
+    assert len(recognizer.backend.calls) == calls
+    assert recognizer.skipped == 2
+
+
+def test_cache_key_includes_backend(cache):
+    crop = Image.new("L", (40, 20), 255)
+    _recognizer(cache, "行くぞ", 90).analyze(crop, {})
+    other = _recognizer(cache, "行くぞ", 60)
+    other.backend.name = "otro"
+    assert other.analyze(crop, {}).quality == pytest.approx(60)
+    assert other.backend.calls
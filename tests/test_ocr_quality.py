@@ -0,0 +1,39 @@
+"""Calidad de las regiones reconocidas (region_quality) con líneas reales de manga"""
+import pytest
+
+from visualocrtranslator.ocr import DEFAULT_OCR_CONFIG, region_quality
+
+
+@pytest.mark.parametrize("text", [
+    "「はい」",
+    "なに！？",
+    "えっ！？",
+    "……",
+    "！？",
+    "ちょっと待って、",
+    "俺は…もう、だめだ。",
+    "『ナルト』だってばよ！",
+    "ドドドドド",
+    "うわあああっ！！",
+])
+def test_punctuation_is_not_noise(text):
+    assert region_quality(text, 85) == pytest.approx(85)
+
+
+@pytest.mark.parametrize("text", ["「はい」", "なに！？", "えっ！？", "行くぞ！"])
+def test_short_balloons_pass_default_threshold(text):
+    assert region_quality(text, 85) >= DEFAULT_OCR_CONFIG['min_quality']
+
+
+def test_symbol_noise_scores_low():
+    assert region_quality("; ~ | ._ ^", 85) == 0
+    assert region_quality("は|~;", 80) == pytest.approx(20)
+
+
+def test_spaces_are_ignored():
+    assert region_quality("は い", 70) == pytest.approx(70)
+
+
+def test_empty_text():
+    assert region_quality("", 90) == 0
+    assert region_quality("   ", 90) == 0
@@ -0,0 +1,120 @@
+"""OllamaClient contra un servidor HTTP local que imita la API de Ollama"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from visualocrtranslator.translation import OllamaClient
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        server.requests.append((self.path, body, self.client_address[1]))
+        if body.get("stream"):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for chunk in server.stream_chunks(self.path):
+                line = json.dumps(chunk).encode("utf-8") + b"\n"
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+            self.wfile.write(b"0\r\n\r\n")
+        else:
+            data = json.dumps({"response": " Hola mundo ", "done": True}).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        # Simula un keep-alive caducado: se cierra sin avisar con «Connection: close»
+        if server.drop_connections:
+            server.drop_connections -= 1
+            self.close_connection = True
+
+
+def _stream_chunks(path):
+    if path == "/api/chat":
+        yield {"message": {"role": "assistant", "content": "Hola"}, "done": False}
+        yield {"message": {"role": "assistant", "content": " mundo"}, "done": False}
+        yield {"message": {"role": "assistant", "content": ""}, "done": True,
+               "prompt_eval_count": 42, "eval_count": 3}
+    else:
+        for token in ["Hola", " mun", "do"]:
+            yield {"response": token, "done": False}
+        yield {"response": "", "done": True}
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.requests = []
+    server.drop_connections = 0
+    server.stream_chunks = _stream_chunks
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def client(server):
+    client = OllamaClient(host=f"127.0.0.1:{server.server_address[1]}", model="stub", timeout=5)
+    yield client
+    client.close()
+
+
+def test_generate(client, server):
+    assert client.generate("hola") == "Hola mundo"
+    path, body, _ = server.requests[0]
+    assert path == "/api/generate"
+    assert body["model"] == "stub" and body["prompt"] == "hola" and body["stream"] is False
+
+
+def test_generate_stream_parses_ndjson(client):
+    assert list(client.generate_stream("hola")) == ["Hola", " mun", "do"]
+
+
+def test_chat_stream_parses_ndjson_and_stats(client, server):
+    stats = {}
+    messages = [{"role": "system", "content": "s"}, {"role": "user", "content": "u"}]
+    assert list(client.chat_stream(messages, stats)) == ["Hola", " mundo"]
+    assert stats == {"prompt_eval_count": 42, "eval_count": 3}
+    assert server.requests[0][0] == "/api/chat"
+    assert server.requests[0][1]["messages"] == messages
+
+
+def test_connections_are_reused(client, server):
+    client.generate("uno")
+    list(client.generate_stream("dos"))
+    client.generate("tres")
+    ports = {port for _, _, port in server.requests}
+    assert len(ports) == 1
+    assert client._pool.qsize() == 1
+
+
+def test_abandoned_stream_closes_connection(client, server):
+    stream = client.generate_stream("hola")
+    assert next(stream) == "Hola"
+    stream.close()
+    # La respuesta a medio leer no vuelve al pool
+    assert client._pool.qsize() == 0
+    client.generate("otra")
+    assert server.requests[0][2] != server.requests[1][2]
+
+
+def test_stale_keep_alive_is_retried_once(client, server):
+    server.drop_connections = 1
+    assert client.generate("uno") == "Hola mundo"
+    assert client._pool.qsize() == 1  # El cliente no sabe que el servidor la cerró
+    assert client.generate("dos") == "Hola mundo"
+    prompts = [body["prompt"] for _, body, _ in server.requests]
+    assert prompts == ["uno", "dos"]
+    assert server.requests[0][2] != server.requests[1][2]
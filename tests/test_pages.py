@@ -0,0 +1,126 @@
+"""Rasterizado bajo demanda (PageProvider) con pdf2image simulado y recortes de la vista enderezada"""
+import cv2
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+
+from visualocrtranslator import pages
+from visualocrtranslator.preprocess import DEFAULT_PREPROCESS_CONFIG, deskew_image
+
+
+@pytest.fixture
+def fake_pdf(monkeypatch):
+    """PDF de 3 páginas; las páginas de `broken` no devuelven imagen"""
+    calls = []
+    broken = set()
+
+    def convert(path, dpi, first_page, last_page, poppler_path=None):
+        calls.append((first_page, last_page))
+        return [Image.new("RGB", (50, 70), "white") for page in range(first_page, last_page + 1)
+                if page - 1 not in broken]
+
+    monkeypatch.setattr(pages, "pdfinfo_from_path", lambda path, poppler_path=None: {"Pages": 3})
+    monkeypatch.setattr(pages, "convert_from_path", convert)
+    return calls, broken
+
+
+def test_get_page_renders_once_and_caches(fake_pdf):
+    calls, _ = fake_pdf
+    provider = pages.PageProvider("doc.pdf", dpi=100, prefetch=0)
+    first = provider.get_page(1)
+    assert provider.get_page(1) is first
+    assert calls == [(2, 2)]
+
+
+def test_get_page_raises_when_page_cannot_be_rendered(fake_pdf):
+    calls, broken = fake_pdf
+    broken.add(2)
+    provider = pages.PageProvider("doc.pdf", dpi=100, prefetch=0)
+    with pytest.raises(RuntimeError):
+        provider.get_page(2)
+    assert calls == [(3, 3)]
+    # Las demás páginas siguen funcionando
+    assert provider.get_page(0).size == (50, 70)
+
+
+def test_prefetch_processed_fills_neighbours_in_one_batch(fake_pdf):
+    provider = pages.PageProvider("doc.pdf", dpi=100, prefetch=0)
+    store = pages.PageStore(provider)
+    config = dict(DEFAULT_PREPROCESS_CONFIG, threshold=True)
+    store.prefetch_processed(1, config)
+    store._background.shutdown(wait=True)
+    for idx in (0, 2):
+        assert pages.PageStore.base_key(idx, config) in store._processed
+    assert not store._in_flight
+
+    def fail(*args):
+        raise AssertionError("la página vecina ya estaba procesada")
+    assert store.base(0, config, fail).mode == "L"
+
+
+def _synthetic_page(size=(400, 300)):
+    """Página con bloques de distintos grises (como globos y viñetas) para comparar recortes"""
+    page = Image.new("L", size, 255)
+    draw = ImageDraw.Draw(page)
+    for i in range(12):
+        x, y = 20 + (i % 4) * 95, 20 + (i // 4) * 90
+        draw.rectangle((x, y, x + 60 + i * 2, y + 45), fill=20 * i)
+        draw.line((x, y + 60, x + 80, y + 70), fill=0, width=3)
+    return page
+
+
+class RasterProvider(pages.PageProvider):
+    """PageProvider sobre una imagen: la página a otra resolución es la imagen escalada"""
+
+    def __init__(self, page, dpi=100):
+        self.page, self.dpi = page, dpi
+
+    def get_page(self, idx):
+        return self.page
+
+    def _render_rect(self, idx, box, dpi):
+        scale = dpi / self.dpi
+        x, y = int(box[0] * scale), int(box[1] * scale)
+        width, height = max(1, round((box[2] - box[0]) * scale)), max(1, round((box[3] - box[1]) * scale))
+        scaled = self.page.resize((round(self.page.width * scale), round(self.page.height * scale)), Image.BICUBIC)
+        return scaled.crop((x, y, x + width, y + height))
+
+
+def _mean_difference(a, b):
+    return float(np.abs(np.asarray(a, dtype=np.float64) - np.asarray(b, dtype=np.float64)).mean())
+
+
+def test_unrotate_box_is_identity_below_deskew_threshold():
+    assert pages.unrotate_box((10, 20, 30, 40), 0.3, (400, 300)) == (10, 20, 30, 40)
+
+
+def test_unrotate_box_contains_the_rotated_region():
+    angle, size, box = 6.0, (400, 300), (100, 80, 220, 160)
+    source = pages.unrotate_box(box, angle, size)
+    inverse = cv2.invertAffineTransform(cv2.getRotationMatrix2D((200, 150), angle, 1.0))
+    for x, y in [(100, 80), (220, 80), (100, 160), (220, 160)]:
+        sx, sy = inverse @ np.array([x, y, 1.0])
+        assert source[0] <= sx <= source[2] and source[1] <= sy <= source[3]
+    # Cerca del borde se recorta a la página
+    assert pages.unrotate_box((0, 0, 400, 300), angle, size) == (0, 0, 400, 300)
+
+
+def test_render_region_without_angle_is_a_plain_crop():
+    page = _synthetic_page()
+    crop = RasterProvider(page).render_region(0, (40, 30, 140, 90), dpi=100)
+    assert _mean_difference(crop, page.crop((40, 30, 140, 90))) == 0
+
+
+@pytest.mark.parametrize("angle", [4.0, -7.5])
+def test_render_region_matches_the_deskewed_view(angle):
+    page = _synthetic_page()
+    view = Image.fromarray(deskew_image(np.asarray(page), angle))
+    box = (100, 80, 220, 160)
+    provider = RasterProvider(page)
+
+    crop = provider.render_region(0, box, dpi=200, angle=angle)
+    assert crop.size == (240, 160)
+    expected = view.crop(box).resize(crop.size, Image.BICUBIC)
+    naive = provider._render_rect(0, box, 200)
+    assert _mean_difference(crop, expected) < 8
+    assert _mean_difference(crop, expected) < _mean_difference(naive, expected) / 2
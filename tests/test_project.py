@@ -0,0 +1,57 @@
+"""TranslationProject: regiones guardadas, páginas completas y cambio de resolución"""
+import json
+
+from visualocrtranslator.project import TranslationProject
+
+
+def _project(tmp_path, dpi=200):
+    return TranslationProject(str(tmp_path / "tomo.pdf"), dpi=dpi)
+
+
+def _batch_result(idx, *boxes):
+    return {"page": idx, "width": 1000, "height": 1400,
+            "regions": [{"box": list(box), "text": "テキスト", "fill": 255, "translation": "Texto"}
+                        for box in boxes]}
+
+
+def test_regions_chosen_by_hand_do_not_complete_the_page(tmp_path):
+    project = _project(tmp_path)
+    project.add_region(0, (10, 10, 100, 60), "はい", 255, "Sí")
+    assert project.regions(0) and not project.is_complete(0)
+
+
+def test_set_page_keeps_saved_regions_and_drops_overlapping_boxes(tmp_path):
+    project = _project(tmp_path)
+    manual = project.add_region(0, (10, 10, 100, 60), "はい", 255, "Sí")
+    added = project.set_page(_batch_result(0, (12, 8, 98, 64), (300, 300, 400, 380)))
+    assert added == 1
+    boxes = {region["id"]: region["box"] for region in project.regions(0)}
+    assert boxes[manual] == [10, 10, 100, 60]
+    assert sorted(boxes.values()) == [[10, 10, 100, 60], [300, 300, 400, 380]]
+    assert project.is_complete(0)
+
+
+def test_complete_page_without_regions_is_saved(tmp_path):
+    project = _project(tmp_path)
+    project.set_page(_batch_result(3))
+    project.save()
+    reloaded = _project(tmp_path)
+    assert reloaded.is_complete(3) and reloaded.regions(3) == []
+    assert [result["page"] for result in reloaded.results()] == [3]
+
+
+def test_coordinates_are_rescaled_to_the_current_dpi(tmp_path):
+    project = _project(tmp_path, dpi=100)
+    region_id = project.add_region(1, (10, 20, 110, 70), "はい", 255, "Sí", size=(800, 1100))
+    project.update_region(1, region_id, position=(15, 25, 90, 40))
+    project.save()
+
+    reloaded = _project(tmp_path, dpi=200)
+    region = reloaded.regions(1)[0]
+    assert region["box"] == [20, 40, 220, 140]
+    assert region["position"] == [30, 50, 180, 80]
+    assert reloaded.result(1)["width"] == 1600 and reloaded.result(1)["height"] == 2200
+    # La conversión se guarda con la nueva resolución
+    reloaded.save()
+    with open(reloaded.path, encoding="utf-8") as f:
+        assert json.load(f)["dpi"] == 200
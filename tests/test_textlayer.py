@@ -0,0 +1,53 @@
+"""TextLayer: lectura de la salida de pdftotext -bbox y consulta por región"""
+from visualocrtranslator.textlayer import TextLayer
+
+OUTPUT = """<!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.0 Transitional//EN" "http://www.w3.org/TR/xhtml1/DTD/xhtml1-transitional.dtd">
+<html xmlns="http://www.w3.org/1999/xhtml">
+<head>
+<title></title>
+</head>
+<body>
+<doc>
+  <page width="595.000000" height="842.000000">
+    <word xMin="72.000000" yMin="90.500000" xMax="96.000000" yMax="102.500000">お前</word>
+    <word xMin="96.000000" yMin="90.500000" xMax="132.000000" yMax="102.500000">の&amp;せい</word>
+    <word xMin="300.000000" yMin="400.000000" xMax="340.000000" yMax="412.000000">だ</word>
+    <word xMin="10.000000" yMin="10.000000" xMax="20.000000" yMax="20.000000">   </word>
+  </page>
+  <page width="595.000000" height="842.000000">
+  </page>
+  <page width="595.000000" height="842.000000">
+    <word xMin="500.000000" yMin="700.000000" xMax="560.000000" yMax="760.000000">完</word>
+  </page>
+</doc>
+</body>
+</html>
+"""
+
+
+def test_parse_words_per_page():
+    pages = TextLayer.parse(OUTPUT)
+    assert [len(words) for words in pages] == [3, 0, 1]
+    assert pages[0][1] == (96.0, 90.5, 132.0, 102.5, "の&せい")
+
+
+def test_has_text_and_word_count():
+    layer = TextLayer(TextLayer.parse(OUTPUT), first_page=4)
+    assert layer.has_text() and layer.has_text(4) and not layer.has_text(5) and not layer.has_text(0)
+    assert layer.word_count() == 4
+
+
+def test_text_in_uses_word_centres_in_view_pixels():
+    layer = TextLayer(TextLayer.parse(OUTPUT))
+    # 144 ppp: el doble de los puntos del PDF
+    assert layer.text_in(0, (140, 175, 270, 210), 144) == "お前の&せい"
+    # La caja solo cubre la primera palabra hasta pasado su centro
+    assert layer.text_in(0, (140, 175, 200, 210), 144) == "お前"
+    assert layer.text_in(0, (0, 0, 100, 100), 144) == ""
+    assert layer.text_in(1, (0, 0, 1190, 1684), 144) == ""
+
+
+def test_text_in_finds_words_spanning_several_cells():
+    layer = TextLayer(TextLayer.parse(OUTPUT), cell=20)
+    assert layer.text_in(2, (1000, 1400, 1120, 1520), 144) == "完"
+    assert layer.text_in(2, (1000, 1400, 1050, 1450), 144) == ""
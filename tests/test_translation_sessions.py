@@ -0,0 +1,60 @@
+"""Caché de traducciones dentro y fuera de las sesiones con contexto"""
+from visualocrtranslator.translation import Translator
+
+
+class DictCache:
+    def __init__(self):
+        self.values = {}
+
+    def get(self, kind, key):
+        return self.values.get((kind, key))
+
+    def put(self, kind, key, value):
+        self.values[(kind, key)] = value
+
+
+class FakeClient:
+    model = "stub"
+
+    def __init__(self):
+        self.calls = []
+
+    def generate_stream(self, prompt):
+        self.calls.append("generate")
+        yield "suelta"
+
+    def chat_stream(self, messages, stats=None):
+        self.calls.append("chat")
+        yield "en sesión"
+
+
+def make_translator():
+    translator = Translator(cache=DictCache())
+    translator.client = FakeClient()
+    return translator
+
+
+def test_session_results_are_not_served_to_stateless_calls():
+    translator = make_translator()
+    assert translator.translate("はい", translator.new_session()) == "en sesión"
+    assert translator.translate("はい") == "suelta"
+    assert translator.client.calls == ["chat", "generate"]
+
+
+def test_stateless_results_are_not_served_inside_sessions():
+    translator = make_translator()
+    assert translator.translate("はい") == "suelta"
+    assert translator.translate("はい", translator.new_session()) == "en sesión"
+    # Cada modo reutiliza su propia entrada
+    assert translator.translate("はい", translator.new_session()) == "en sesión"
+    assert translator.translate("はい") == "suelta"
+    assert translator.client.calls == ["generate", "chat"]
+
+
+def test_busy_session_falls_back_to_stateless_cache():
+    translator = make_translator()
+    session = translator.new_session()
+    with session.lock:
+        assert translator.translate("はい", session) == "suelta"
+    assert translator.translate("はい") == "suelta"
+    assert translator.client.calls == ["generate"]
@@ -0,0 +1,26 @@
+"""Núcleo de VisualOCRTranslator: rasterizado, preprocesamiento, OCR y traducción sin tkinter"""
+from .cache import ResultCache, default_cache_path
+from .detection import detect_text_regions
+from .jobs import Job, JobScheduler
+from .ocr import DEFAULT_OCR_CONFIG, TextRecognizer
+from .memory import DEFAULT_MEMORY_CONFIG, TranslationMemory, memory_path
+from .pages import DEFAULT_RENDER_CONFIG, PageProvider, PageStore, default_poppler_path
+from .preprocess import DEFAULT_PREPROCESS_CONFIG, deskew_image, preprocess_image
+from .project import TranslationProject, project_path
+from .textlayer import TextLayer
+from .thumbnails import ThumbnailStore
+from .translation import DEFAULT_TRANSLATION_CONFIG, OllamaClient, Translator
+
+__all__ = [
+    "ResultCache", "default_cache_path",
+    "detect_text_regions",
+    "Job", "JobScheduler",
+    "DEFAULT_OCR_CONFIG", "TextRecognizer",
+    "DEFAULT_MEMORY_CONFIG", "TranslationMemory", "memory_path",
+    "DEFAULT_RENDER_CONFIG", "PageProvider", "PageStore", "default_poppler_path",
+    "DEFAULT_PREPROCESS_CONFIG", "deskew_image", "preprocess_image",
+    "TranslationProject", "project_path",
+    "TextLayer",
+    "ThumbnailStore",
+    "DEFAULT_TRANSLATION_CONFIG", "OllamaClient", "Translator",
+]
@@ -0,0 +1,61 @@
+"""Línea de comandos: python -m visualocrtranslator batch entrada.pdf --out salida.json|salida.pdf
+
+python -m visualocrtranslator bench-ocr recorte.png ... | entrada.pdf compara los motores de OCR.
+"""
+import os
+import sys
+import argparse
+
+from .batch import run_batch
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="visualocrtranslator",
+                                     description="OCR y traducción de PDF sin interfaz gráfica")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    batch = subparsers.add_parser("batch", help="Traducir un PDF completo")
+    batch.add_argument("pdf", help="PDF de entrada")
+    batch.add_argument("--out", required=True, help="Archivo de salida (.json o .pdf)")
+    batch.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Procesos en paralelo")
+    batch.add_argument("--dpi", type=int, default=None, help="Resolución de las coordenadas y del PDF exportado")
+    batch.add_argument("--ocr-dpi", type=int, default=None, help="Resolución de rasterizado para el OCR")
+    batch.add_argument("--model", default=None, help="Modelo de Ollama")
+    batch.add_argument("--host", default=None, help="Dirección de la API de Ollama")
+    batch.add_argument("--no-cache", action="store_true", help="No usar la caché de OCR y traducciones")
+    batch.add_argument("--ocr-layer", action="store_true",
+                       help="Añadir al PDF exportado el texto japonés como capa invisible de búsqueda")
+    batch.add_argument("--no-project", action="store_true",
+                       help="Ignorar el proyecto de traducción guardado junto al PDF")
+    batch.add_argument("--no-memory", action="store_true",
+                       help="No usar la memoria de traducción de la carpeta")
+
+    bench = subparsers.add_parser("bench-ocr", help="Comparar la latencia de OCR de tesserocr y pytesseract")
+    bench.add_argument("inputs", nargs="+", help="Imágenes de recortes o PDF (se usan las regiones detectadas)")
+    bench.add_argument("--page", type=int, default=1, help="Página de los PDF de entrada")
+    bench.add_argument("--repeat", type=int, default=3, help="Repeticiones por recorte")
+
+    args = parser.parse_args(argv)
+    if args.command == "batch":
+        translation_config = {}
+        if args.model:
+            translation_config['model'] = args.model
+        if args.host:
+            translation_config['host'] = args.host
+        return run_batch(args.pdf, args.out, workers=args.workers, dpi=args.dpi, ocr_dpi=args.ocr_dpi,
+                         translation_config=translation_config, use_cache=not args.no_cache,
+                         use_project=not args.no_project, ocr_layer=args.ocr_layer,
+                         use_memory=not args.no_memory)
+    if args.command == "bench-ocr":
+        from .benchmark import benchmark_ocr, load_crops
+        crops = load_crops(args.inputs, page=args.page - 1)
+        if not crops:
+            print("No hay recortes que medir")
+            return 1
+        print(f"{len(crops)} recortes, {args.repeat} repeticiones")
+        benchmark_ocr(crops, repeat=args.repeat)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
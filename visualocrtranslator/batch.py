@@ -0,0 +1,172 @@
+"""Procesamiento por lotes de PDF completos sin interfaz gráfica"""
+import os
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from pdf2image import convert_from_path, pdfinfo_from_path
+
+from .cache import ResultCache, default_cache_path
+from .detection import detect_text_regions
+from .export import export_pdf
+from .memory import TranslationMemory, memory_path
+from .ocr import DEFAULT_OCR_CONFIG, TextRecognizer
+from .pages import DEFAULT_RENDER_CONFIG, default_poppler_path
+from .preprocess import DEFAULT_PREPROCESS_CONFIG
+from .project import TranslationProject
+from .textlayer import TextLayer
+from .translation import DEFAULT_TRANSLATION_CONFIG, Translator
+
+# Estado de cada proceso del pool: se crea una vez y se reutiliza entre páginas
+_worker = {}
+
+
+def _init_worker(options):
+    cache = ResultCache(options['cache_path']) if options['cache_path'] else None
+    _worker['options'] = options
+    _worker['recognizer'] = TextRecognizer(options['ocr_config'], cache=cache, verbose=False)
+    memory = TranslationMemory(options['memory_path']) if options['memory_path'] else None
+    _worker['translator'] = Translator(options['translation_config'], cache=cache, memory=memory)
+
+
+def process_page(pdf_path, idx):
+    """Detectar, reconocer y traducir todas las regiones de texto de una página
+
+    La página se rasteriza una sola vez a la resolución de OCR; las cajas del resultado
+    se dan en píxeles a options['dpi'], la resolución de la vista y de la exportación.
+    """
+    options = _worker['options']
+    image = convert_from_path(pdf_path, dpi=options['ocr_dpi'], first_page=idx + 1, last_page=idx + 1,
+                              poppler_path=options['poppler_path'])[0]
+    scale = options['dpi'] / options['ocr_dpi']
+    # En PDF con texto incrustado las regiones que lo tienen no pasan por el OCR
+    try:
+        layer = TextLayer.extract(pdf_path, options['poppler_path'], first=idx, last=idx)
+    except Exception:
+        layer = None
+    regions = []
+    skipped = 0
+    for box in detect_text_regions(image):
+        crop = image.crop(box)
+        text = layer.text_in(idx, box, options['ocr_dpi']) if layer else ""
+        if not text:
+            result = _worker['recognizer'].analyze(crop, options['preprocess_config'])
+            skipped += result.dropped
+            text = result.text
+        if text.strip():
+            fill = crop.resize((1, 1)).getpixel((0, 0))
+            regions.append({"box": [round(v * scale) for v in box], "text": text, "fill": fill})
+
+    translations = _worker['translator'].translate_texts([r["text"] for r in regions]) if regions else []
+    for region, translation in zip(regions, translations):
+        region["translation"] = translation or ""
+    return {"page": idx, "width": round(image.width * scale), "height": round(image.height * scale),
+            "dpi": options['dpi'], "regions": regions,
+            "skipped_regions": skipped}
+
+
+def _load_progress(progress_path):
+    """Páginas ya terminadas en una ejecución anterior interrumpida"""
+    done = {}
+    if not os.path.exists(progress_path):
+        return done
+    with open(progress_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except ValueError:
+                continue  # Última línea a medio escribir
+            done[result["page"]] = result
+    return done
+
+
+def run_batch(pdf_path, out_path, workers=None, dpi=None, translation_config=None, use_cache=True,
+              use_project=True, ocr_layer=False, ocr_dpi=None, use_memory=True):
+    """Procesar el PDF en paralelo por páginas y escribir out.json o out.pdf
+
+    Con use_project las páginas ya procesadas enteras en el proyecto del documento
+    (incluidas las ediciones hechas en la interfaz) no se vuelven a procesar; en las
+    que solo tienen regiones elegidas a mano se añaden las demás. Con use_memory las
+    frases repetidas se sirven desde la memoria de traducción de la carpeta (la serie).
+    """
+    poppler_path = default_poppler_path()
+    options = {
+        'dpi': dpi or DEFAULT_RENDER_CONFIG['dpi'],
+        'ocr_dpi': ocr_dpi or DEFAULT_RENDER_CONFIG['ocr_dpi'],
+        'poppler_path': poppler_path,
+        'cache_path': default_cache_path() if use_cache else None,
+        'memory_path': memory_path(pdf_path) if use_memory else None,
+        'ocr_config': dict(DEFAULT_OCR_CONFIG),
+        'preprocess_config': dict(DEFAULT_PREPROCESS_CONFIG),
+        'translation_config': dict(DEFAULT_TRANSLATION_CONFIG, **(translation_config or {})),
+    }
+    page_count = pdfinfo_from_path(pdf_path, poppler_path=poppler_path)["Pages"]
+
+    # Reanudación: cada página terminada se añade a un archivo de progreso
+    progress_path = out_path + ".progress.jsonl"
+    done = _load_progress(progress_path)
+    project = TranslationProject(pdf_path, dpi=options['dpi']) if use_project else None
+    if project:
+        for result in project.results():
+            if project.is_complete(result["page"]):
+                done.setdefault(result["page"], result)
+    pending = [idx for idx in range(page_count) if idx not in done]
+    if done:
+        print(f"Reanudando: {len(done)} de {page_count} páginas ya procesadas")
+
+    start = time.perf_counter()
+    processed = 0
+    skipped = 0
+    failed = []
+    if pending:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(options,)) as pool, \
+                open(progress_path, "a", encoding="utf-8") as progress:
+            futures = {pool.submit(process_page, pdf_path, idx): idx for idx in pending}
+            for future in as_completed(futures):
+                idx = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"Error en la página {idx + 1}: {e}")
+                    failed.append(idx)
+                    continue
+                progress.write(json.dumps(result, ensure_ascii=False) + "\n")
+                progress.flush()
+                done[idx] = result
+                skipped += result.get("skipped_regions", 0)
+                if project:
+                    project.set_page(result)
+                    # Lo que se exporta incluye las regiones que ya había en el proyecto
+                    done[idx] = project.result(idx)
+                processed += 1
+                elapsed = time.perf_counter() - start
+                print(f"[{len(done)}/{page_count}] página {idx + 1}: {len(result['regions'])} regiones "
+                      f"({processed / elapsed:.2f} pág/s)")
+
+    if project:
+        try:
+            project.save()
+        except OSError as e:
+            print(f"No se pudo guardar el proyecto: {e}")
+    elapsed = time.perf_counter() - start
+    if processed:
+        print(f"{processed} páginas en {elapsed:.1f}s ({processed / elapsed:.2f} pág/s)")
+    if skipped:
+        print(f"{skipped} regiones descartadas por baja calidad del OCR (no se enviaron al modelo)")
+    if failed:
+        print(f"{len(failed)} páginas con errores; vuelve a ejecutar el comando para reintentarlas")
+        return 1
+
+    results = [done[idx] for idx in sorted(done)]
+    if out_path.lower().endswith(".pdf"):
+        export_pdf(pdf_path, results, out_path, dpi=options['dpi'], poppler_path=poppler_path, ocr_layer=ocr_layer,
+                   raster_dpi=DEFAULT_RENDER_CONFIG['export_dpi'])
+    else:
+        tmp_path = out_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"source": os.path.abspath(pdf_path), "pages": results}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, out_path)
+    if os.path.exists(progress_path):
+        os.remove(progress_path)
+    print(f"Resultado guardado en {out_path}")
+    return 0
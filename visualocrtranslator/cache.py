@@ -0,0 +1,83 @@
+"""Caché persistente de resultados de OCR y traducción"""
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+
+def default_cache_path():
+    """Ubicación por defecto de la caché, compartida por la interfaz y el modo por lotes"""
+    return os.path.join(os.path.expanduser("~"), ".visualocrtranslator", "cache.sqlite3")
+
+
+class ResultCache:
+    """Caché persistente en SQLite de resultados de OCR y traducción, direccionada por contenido"""
+
+    KINDS = ("ocr", "translation")
+
+    def __init__(self, path, max_entries=100000):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = {kind: 0 for kind in self.KINDS}
+        self.misses = {kind: 0 for kind in self.KINDS}
+        self._lock = threading.Lock()
+        # El timeout permite compartir el archivo entre procesos del modo por lotes
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        for kind in self.KINDS:
+            self._conn.execute(f"CREATE TABLE IF NOT EXISTS {kind} "
+                               "(key TEXT PRIMARY KEY, value TEXT NOT NULL, accessed REAL NOT NULL)")
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS {kind}_accessed ON {kind} (accessed)")
+        self._conn.commit()
+
+    @staticmethod
+    def ocr_key(image, preprocess_config, lang, ocr_config):
+        """Clave de OCR: hash de los píxeles del recorte más la configuración usada"""
+        digest = hashlib.sha256()
+        digest.update(f"{image.mode}:{image.size}".encode("utf-8"))
+        digest.update(image.tobytes())
+        digest.update(json.dumps([sorted(preprocess_config.items()), lang, ocr_config]).encode("utf-8"))
+        return digest.hexdigest()
+
+    @staticmethod
+    def translation_key(text, model, prompt):
+        """Clave de traducción: texto de origen, modelo y plantilla del prompt"""
+        return hashlib.sha256(json.dumps([text, model, prompt]).encode("utf-8")).hexdigest()
+
+    def get(self, kind, key):
+        """Devolver el valor guardado o None si no está en caché"""
+        with self._lock:
+            row = self._conn.execute(f"SELECT value FROM {kind} WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses[kind] += 1
+                return None
+            self.hits[kind] += 1
+            self._conn.execute(f"UPDATE {kind} SET accessed = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            return row[0]
+
+    def put(self, kind, key, value):
+        with self._lock:
+            self._conn.execute(f"INSERT OR REPLACE INTO {kind} (key, value, accessed) VALUES (?, ?, ?)",
+                               (key, value, time.time()))
+            self._evict(kind)
+            self._conn.commit()
+
+    def _evict(self, kind):
+        """Expulsar las entradas menos usadas recientemente si se supera el límite (requiere el lock)"""
+        count = self._conn.execute(f"SELECT COUNT(*) FROM {kind}").fetchone()[0]
+        if count <= self.max_entries:
+            return
+        # Se libera un 10% extra para no expulsar en cada inserción
+        excess = count - self.max_entries + self.max_entries // 10
+        self._conn.execute(f"DELETE FROM {kind} WHERE key IN "
+                           f"(SELECT key FROM {kind} ORDER BY accessed LIMIT ?)", (excess,))
+
+    def stats(self):
+        return {kind: {"hits": self.hits[kind], "misses": self.misses[kind]} for kind in self.KINDS}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
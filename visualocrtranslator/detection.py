@@ -0,0 +1,74 @@
+"""Detección automática de bloques de texto en una página"""
+import cv2
+import numpy as np
+
+
+def detect_text_regions(image, right_to_left=True, max_regions=60):
+    """Proponer bloques de texto (bocadillos) de una página, ordenados para la lectura"""
+    gray = np.array(image.convert("L"))
+    full_h, full_w = gray.shape
+    # La detección no necesita resolución completa
+    scale = min(1.0, 1200 / max(full_h, full_w))
+    if scale < 1.0:
+        gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    h, w = gray.shape
+    page_area = h * w
+    
+    # Tinta oscura sobre fondo claro → máscara binaria
+    ink = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV, 25, 15)
+    # Quitar las líneas rectas largas (marcos de viñeta) para que no unan bloques
+    horizontal = cv2.morphologyEx(ink, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (max(1, w // 10), 1)))
+    vertical = cv2.morphologyEx(ink, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (1, max(1, h // 10))))
+    ink = cv2.subtract(ink, cv2.bitwise_or(horizontal, vertical))
+    # Cerrar los huecos entre caracteres para que cada bloque sea un componente
+    k = max(3, int(round(min(h, w) / 80)))
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (k, k))
+    merged = cv2.morphologyEx(ink, cv2.MORPH_CLOSE, kernel, iterations=2)
+    
+    _, _, stats, _ = cv2.connectedComponentsWithStats(merged, connectivity=8)
+    boxes = []
+    for x, y, bw, bh, _ in stats[1:]:
+        box_area = bw * bh
+        # Descartar ruido, marcos de viñeta e ilustraciones grandes
+        if box_area < page_area * 0.0005 or box_area > page_area * 0.25:
+            continue
+        if bw > w * 0.9 or bh > h * 0.9:
+            continue
+        # El texto tiene una densidad de tinta intermedia (ni trazos sueltos ni zonas sólidas)
+        density = np.count_nonzero(ink[y:y + bh, x:x + bw]) / box_area
+        if not 0.05 <= density <= 0.6:
+            continue
+        boxes.append([x, y, x + bw, y + bh])
+    
+    # Fusionar bloques solapados o muy próximos (columnas de un mismo bocadillo)
+    gap = k * 2
+    merged_any = True
+    while merged_any:
+        merged_any = False
+        result = []
+        for box in boxes:
+            for other in result:
+                if (box[0] - gap < other[2] and other[0] - gap < box[2] and
+                        box[1] - gap < other[3] and other[1] - gap < box[3]):
+                    other[0], other[1] = min(other[0], box[0]), min(other[1], box[1])
+                    other[2], other[3] = max(other[2], box[2]), max(other[3], box[3])
+                    merged_any = True
+                    break
+            else:
+                result.append(box)
+        boxes = result
+    
+    # Quedarse con los más grandes si hay demasiados
+    boxes = sorted(boxes, key=lambda b: (b[2] - b[0]) * (b[3] - b[1]), reverse=True)[:max_regions]
+    
+    # Volver a coordenadas de página con un pequeño margen
+    pad = 4
+    regions = []
+    for x1, y1, x2, y2 in boxes:
+        regions.append((max(0, int(x1 / scale) - pad), max(0, int(y1 / scale) - pad),
+                        min(full_w, int(x2 / scale) + pad), min(full_h, int(y2 / scale) + pad)))
+    
+    # Orden de lectura: por franjas horizontales y, dentro de cada una, de derecha a izquierda (manga)
+    band = max(1, full_h // 10)
+    regions.sort(key=lambda r: (r[1] // band, -r[2] if right_to_left else r[0]))
+    return regions
@@ -0,0 +1,207 @@
+"""Exportación de las traducciones a un PDF nuevo con texto real (no rasterizado)"""
+import io
+import os
+from functools import lru_cache
+
+from PIL import ImageFont
+from pdf2image import convert_from_path, pdfinfo_from_path
+
+
+@lru_cache(maxsize=64)
+def _load_font(size):
+    for name in ("arial.ttf", "DejaVuSans.ttf"):
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    return ImageFont.load_default(size=size)
+
+
+def _wrap(text, font, width):
+    """Partir el texto en líneas que quepan en el ancho dado"""
+    lines = []
+    for paragraph in text.split("\n"):
+        line = ""
+        for word in paragraph.split(" "):
+            candidate = f"{line} {word}" if line else word
+            if line and font.getlength(candidate) > width:
+                lines.append(line)
+                line = word
+            else:
+                line = candidate
+        lines.append(line)
+    return lines
+
+
+def fit_text(text, width, height, max_size=40, min_size=6):
+    """Mayor tamaño de letra (en puntos) con el que el texto cabe en la caja; devuelve (tamaño, líneas)"""
+    for size in range(max_size, min_size - 1, -1):
+        lines = _wrap(text, _load_font(size), width)
+        if len(lines) * size * 1.2 <= height:
+            break
+    return size, lines
+
+
+def _rgb(fill):
+    """Color de fondo de la región (gris, RGB o RGBA) como componentes 0-1"""
+    if isinstance(fill, (int, float)):
+        return (fill / 255,) * 3
+    return tuple(c / 255 for c in list(fill)[:3])
+
+
+def _pdf_string(text):
+    """Cadena literal de PDF en WinAnsiEncoding"""
+    data = text.encode("cp1252", errors="replace")
+    return b"(" + data.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+
+class PdfWriter:
+    """Escritor de PDF mínimo que vuelca cada objeto al archivo en cuanto se genera"""
+
+    def __init__(self, f):
+        self.f = f
+        self.offsets = {}
+        self.next_id = 1
+        f.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def reserve(self):
+        obj_id = self.next_id
+        self.next_id += 1
+        return obj_id
+
+    def write(self, obj_id, body, stream=None):
+        """Escribir el objeto obj_id; body es el diccionario (bytes) sin /Length"""
+        self.offsets[obj_id] = self.f.tell()
+        self.f.write(f"{obj_id} 0 obj\n".encode("ascii"))
+        if stream is None:
+            self.f.write(body)
+        else:
+            self.f.write(body[:-2] + f" /Length {len(stream)} >>".encode("ascii"))
+            self.f.write(b"\nstream\n" + stream + b"\nendstream")
+        self.f.write(b"\nendobj\n")
+        return obj_id
+
+    def add(self, body, stream=None):
+        return self.write(self.reserve(), body, stream)
+
+    def close(self, root_id):
+        """Tabla de referencias cruzadas y trailer"""
+        xref = self.f.tell()
+        count = self.next_id
+        self.f.write(f"xref\n0 {count}\n0000000000 65535 f \n".encode("ascii"))
+        for obj_id in range(1, count):
+            self.f.write(f"{self.offsets.get(obj_id, 0):010d} 00000 n \n".encode("ascii"))
+        self.f.write(f"trailer\n<< /Size {count} /Root {root_id} 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("ascii"))
+
+
+def _write_fonts(writer):
+    """Helvetica con los anchos de la fuente usada para medir, y una fuente CID japonesa para la capa OCR"""
+    metrics = _load_font(1000)
+    widths = []
+    for code in range(32, 256):
+        try:
+            char = bytes([code]).decode("cp1252")
+        except UnicodeDecodeError:
+            char = " "
+        widths.append(round(metrics.getlength(char)))
+    text_font = writer.add(
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding "
+        b"/FirstChar 32 /LastChar 255 /Widths [" + " ".join(map(str, widths)).encode("ascii") + b"] >>")
+
+    descriptor = writer.add(
+        b"<< /Type /FontDescriptor /FontName /HeiseiMin-W3 /Flags 6 /FontBBox [-123 -257 1075 880] "
+        b"/ItalicAngle 0 /Ascent 723 /Descent -241 /CapHeight 709 /StemV 69 >>")
+    cid_font = writer.add(
+        b"<< /Type /Font /Subtype /CIDFontType0 /BaseFont /HeiseiMin-W3 "
+        b"/CIDSystemInfo << /Registry (Adobe) /Ordering (Japan1) /Supplement 2 >> /DW 1000 "
+        b"/FontDescriptor " + f"{descriptor} 0 R".encode("ascii") + b" >>")
+    ocr_font = writer.add(
+        b"<< /Type /Font /Subtype /Type0 /BaseFont /HeiseiMin-W3 /Encoding /UniJIS-UCS2-H "
+        b"/DescendantFonts [" + f"{cid_font} 0 R".encode("ascii") + b"] >>")
+    return text_font, ocr_font
+
+
+def page_content(regions, page_height, scale, ocr_layer=False):
+    """Operadores de la página: tapar cada región y escribir su traducción (y el OCR invisible)
+
+    scale convierte píxeles de la página rasterizada a puntos (72 / dpi).
+    """
+    ops = []
+    for region in regions:
+        x1, y1, x2, y2 = [v * scale for v in region["box"]]
+        r, g, b = _rgb(region["fill"])
+        ops.append(f"{r:.3f} {g:.3f} {b:.3f} rg {x1:.2f} {page_height - y2:.2f} {x2 - x1:.2f} {y2 - y1:.2f} re f"
+                   .encode("ascii"))
+
+        # La traducción va donde el usuario dejó el overlay; si no se movió, sobre la región
+        if region.get("position"):
+            px, py, pw, ph = [v * scale for v in region["position"]]
+        else:
+            px, py, pw, ph = x1, y1, x2 - x1, y2 - y1
+        translation = region.get("translation") or ""
+        if translation.strip():
+            size, lines = fit_text(translation, pw, ph)
+            ops.append(f"BT 0 Tr 0 g /F1 {size} Tf {size * 1.2:.2f} TL {px:.2f} {page_height - py - size:.2f} Td"
+                       .encode("ascii"))
+            for i, line in enumerate(lines):
+                ops.append((b"T* " if i else b"") + _pdf_string(line) + b" Tj")
+            ops.append(b"ET")
+
+        # Capa de búsqueda: el texto original invisible (modo 3) repartido a lo ancho de la región
+        text = region.get("text") or ""
+        if ocr_layer and text.strip():
+            chars = [c for c in text if ord(c) <= 0xFFFF]
+            size = max(1.0, (x2 - x1) / max(1, len(chars)))
+            ops.append(f"BT 3 Tr /F2 {size:.2f} Tf {x1:.2f} {page_height - y1 - size:.2f} Td <".encode("ascii")
+                       + "".join(chars).encode("utf-16-be").hex().encode("ascii") + b"> Tj ET")
+    return b"\n".join(ops)
+
+
+def export_pdf(pdf_path, results, out_path, dpi=200, poppler_path=None, ocr_layer=False, progress=None,
+               jpeg_quality=85, raster_dpi=300):
+    """Escribir el PDF traducido página a página, sin tener todo el documento en memoria
+
+    Cada página original se incrusta como imagen a raster_dpi y las traducciones se
+    escriben como texto seleccionable; dpi es la resolución de las coordenadas de las
+    regiones (la de la vista). Con ocr_layer se añade el texto japonés reconocido como
+    capa invisible para poder buscar en el PDF. progress(hechas, total) informa del avance.
+    """
+    page_count = pdfinfo_from_path(pdf_path, poppler_path=poppler_path)["Pages"]
+    regions_by_page = {page["page"]: page["regions"] for page in results}
+    scale = 72 / dpi
+
+    tmp_path = out_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        writer = PdfWriter(f)
+        catalog, pages = writer.reserve(), writer.reserve()
+        text_font, ocr_font = _write_fonts(writer)
+        kids = []
+        for idx in range(page_count):
+            image = convert_from_path(pdf_path, dpi=raster_dpi, first_page=idx + 1, last_page=idx + 1,
+                                      poppler_path=poppler_path)[0]
+            if image.mode not in ("RGB", "L"):
+                image = image.convert("RGB")
+            buffer = io.BytesIO()
+            image.save(buffer, "JPEG", quality=jpeg_quality)
+            color_space = "DeviceGray" if image.mode == "L" else "DeviceRGB"
+            xobject = writer.add(f"<< /Type /XObject /Subtype /Image /Width {image.width} /Height {image.height} "
+                                 f"/ColorSpace /{color_space} /BitsPerComponent 8 /Filter /DCTDecode >>"
+                                 .encode("ascii"), buffer.getvalue())
+
+            width, height = image.width * 72 / raster_dpi, image.height * 72 / raster_dpi
+            content = f"q {width:.2f} 0 0 {height:.2f} 0 0 cm /Im0 Do Q\n".encode("ascii")
+            content += page_content(regions_by_page.get(idx, []), height, scale, ocr_layer)
+            contents = writer.add(b"<< >>", content)
+            kids.append(writer.add(
+                f"<< /Type /Page /Parent {pages} 0 R /MediaBox [0 0 {width:.2f} {height:.2f}] "
+                f"/Resources << /XObject << /Im0 {xobject} 0 R >> "
+                f"/Font << /F1 {text_font} 0 R /F2 {ocr_font} 0 R >> >> /Contents {contents} 0 R >>"
+                .encode("ascii")))
+            if progress:
+                progress(idx + 1, page_count)
+
+        writer.write(pages, f"<< /Type /Pages /Kids [{' '.join(f'{k} 0 R' for k in kids)}] /Count {len(kids)} >>"
+                     .encode("ascii"))
+        writer.write(catalog, f"<< /Type /Catalog /Pages {pages} 0 R >>".encode("ascii"))
+        writer.close(catalog)
+    os.replace(tmp_path, out_path)
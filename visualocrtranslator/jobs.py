@@ -0,0 +1,84 @@
+"""Cola de trabajos cancelables con entrega de resultados a la interfaz"""
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Job:
+    """Trabajo cancelable de la cadena recorte → preproceso → OCR → traducción → overlay"""
+
+    def __init__(self, job_id, description):
+        self.id = job_id
+        self.description = description
+        self.state = "en cola"
+        self._cancel_event = threading.Event()
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+
+class JobScheduler:
+    """Ejecuta trabajos en un pool acotado y entrega los resultados a Tk con root.after"""
+
+    def __init__(self, root, max_workers=2, on_change=None):
+        self.root = root
+        self.on_change = on_change
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._next_id = 1
+
+    def submit(self, description, fn, *args):
+        """Encolar fn(job, *args) y devolver el Job; fn debe comprobar job.cancelled entre etapas"""
+        with self._lock:
+            job = Job(self._next_id, description)
+            self._next_id += 1
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, fn, args)
+        self._notify()
+        return job
+
+    def _run(self, job, fn, args):
+        # fn se ejecuta aunque el trabajo se haya cancelado en cola, para que pueda limpiar
+        try:
+            fn(job, *args)
+            self._finish(job, "cancelado" if job.cancelled else "hecho")
+        except Exception as e:
+            print(f"Error en el trabajo {job.id}: {e}")
+            self._finish(job, "error")
+
+    def set_state(self, job, state):
+        job.state = state
+        self._notify()
+
+    def _finish(self, job, state):
+        job.state = state
+        with self._lock:
+            self._jobs.pop(job.id, None)
+        self._notify()
+
+    def call_in_ui(self, fn, *args):
+        """Ejecutar fn en la hebra de Tk"""
+        self.root.after(0, fn, *args)
+
+    def jobs(self):
+        with self._lock:
+            return list(self._jobs.values())
+
+    def cancel(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job:
+            job.cancel()
+
+    def cancel_all(self):
+        for job in self.jobs():
+            job.cancel()
+
+    def _notify(self):
+        if self.on_change:
+            self.root.after(0, self.on_change)
@@ -0,0 +1,251 @@
+"""Memoria de traducción: pares original→traducción reutilizables en todo un volumen o serie"""
+import os
+import time
+import random
+import sqlite3
+import threading
+import unicodedata
+import zlib
+from collections import Counter, namedtuple
+from difflib import SequenceMatcher
+
+import numpy as np
+
+DEFAULT_MEMORY_CONFIG = {
+    'enabled': True,
+    # Similitud mínima (0-1) para servir una traducción guardada sin llamar al modelo
+    'threshold': 0.9,
+    # Caracteres por cada diferencia tolerada: en una frase corta un carácter cambia el
+    # sentido (お前のせいじゃない / お前のせいじゃないか), así que tiene que coincidir entera
+    'chars_per_difference': 15,
+    # Las entradas cortas (nombres, onomatopeyas en katakana) se ofrecen al modelo como glosario;
+    # las de solo hiragana son partículas y muletillas (はい, ない) que aparecen dentro de cualquier frase
+    'term_min_len': 3,
+    'term_max_len': 12,
+    'max_terms': 8,
+}
+
+# MinHash con LSH: 32 permutaciones en 8 bandas de 4 filas; dos textos con ~80% de
+# shingles en común coinciden en alguna banda con probabilidad > 0.98
+NUM_PERM = 32
+BANDS = 8
+ROWS = NUM_PERM // BANDS
+# Candidatos que se comparan carácter a carácter (los de más bandas en común)
+MAX_CANDIDATES = 5
+
+_PRIME = 4294967311  # Primo mayor que 2^32
+_rng = random.Random(0x766F74)  # Semilla fija: las firmas se guardan en la base de datos
+_A = np.array([_rng.randrange(1, 2 ** 31) for _ in range(NUM_PERM)], dtype=np.uint64)[:, None]
+_B = np.array([_rng.randrange(0, 2 ** 31) for _ in range(NUM_PERM)], dtype=np.uint64)[:, None]
+# Multiplicadores impares para reducir las filas de cada banda a una clave de 64 bits
+_BAND_MIX = np.array([_rng.getrandbits(64) | 1 for _ in range(ROWS)], dtype=np.uint64)
+
+Match = namedtuple("Match", "source target score")
+
+
+def memory_path(pdf_path):
+    """Memoria compartida por los PDF de la misma carpeta (los volúmenes de una serie)"""
+    return os.path.join(os.path.dirname(os.path.abspath(pdf_path)), "vot-memoria.sqlite3")
+
+
+def normalize(text):
+    """Forma canónica para comparar: NFKC y sin espacios (el OCR los mete entre caracteres japoneses)"""
+    return "".join(unicodedata.normalize("NFKC", text).split())
+
+
+def shingles(text):
+    """Caracteres sueltos y bigramas: el japonés no separa palabras"""
+    return set(text) | {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+def signature(text):
+    """Firma MinHash del texto normalizado (NUM_PERM enteros de 32 bits)"""
+    hashes = np.array([zlib.crc32(s.encode("utf-8")) for s in shingles(text)], dtype=np.uint64)
+    return ((_A * hashes + _B) % _PRIME).min(axis=1).astype(np.uint32)
+
+
+def _strip_punctuation(text):
+    """Quitar la puntuación y los símbolos de los extremos (「ナルト」！ -> ナルト)"""
+    start, end = 0, len(text)
+    while start < end and unicodedata.category(text[start])[0] in "PS":
+        start += 1
+    while end > start and unicodedata.category(text[end - 1])[0] in "PS":
+        end -= 1
+    return text[start:end]
+
+
+def glossary_term(source, target, min_len=3, max_len=12):
+    """(término, traducción) si la entrada sirve para el glosario, o None
+
+    El término se busca como subcadena dentro de otras frases: tiene que ser lo bastante
+    largo y no solo hiragana para no aparecer por casualidad.
+    """
+    term = _strip_punctuation(source)
+    if not min_len <= len(term) <= max_len or not all(unicodedata.category(c)[0] in "LN" for c in term):
+        return None
+    if all("\u3041" <= c <= "\u309f" or c == "ー" for c in term):
+        return None
+    return term, _strip_punctuation(target) or target
+
+
+def band_keys(signatures):
+    """Clave de cada banda para una o varias firmas: (n, NUM_PERM) -> (n, BANDS)"""
+    rows = np.atleast_2d(signatures).astype(np.uint64).reshape(-1, BANDS, ROWS)
+    return (rows * _BAND_MIX).sum(axis=2, dtype=np.uint64)
+
+
+class TranslationMemory:
+    """Pares original→traducción en SQLite con índice MinHash en memoria
+
+    Las búsquedas exactas van por diccionario; las aproximadas (ruido del OCR) por
+    LSH sobre la firma MinHash, verificando solo unos pocos candidatos. Una coincidencia
+    aproximada admite una diferencia por cada chars_per_difference caracteres.
+    """
+
+    def __init__(self, path, threshold=0.9, chars_per_difference=15, term_min_len=3, term_max_len=12,
+                 max_terms=8):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.threshold = threshold
+        self.chars_per_difference = chars_per_difference
+        self.term_min_len = term_min_len
+        self.term_max_len = term_max_len
+        self.max_terms = max_terms
+        self.hits = 0
+        self.fuzzy_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._sources = []
+        self._targets = []
+        self._ids = {}  # original normalizado -> índice
+        # Clave de la banda -> índice, o lista de índices si varios coinciden (la mayoría son únicas)
+        self._bands = [{} for _ in range(BANDS)]
+        self._terms = {}  # término (entrada corta sin puntuación) -> traducción, para el glosario
+        # El timeout permite compartir el archivo entre procesos del modo por lotes
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS segments "
+                           "(source TEXT PRIMARY KEY, target TEXT NOT NULL, signature BLOB NOT NULL)")
+        self._conn.commit()
+
+        start = time.perf_counter()
+        rows = self._conn.execute("SELECT source, target, signature FROM segments").fetchall()
+        if rows:
+            signatures = np.frombuffer(b"".join(row[2] for row in rows), dtype=np.uint32).reshape(-1, NUM_PERM)
+            for (source, target, _), keys in zip(rows, band_keys(signatures).tolist()):
+                self._index(source, target, keys)
+        if self._sources:
+            print(f"Memoria de traducción: {len(self._sources)} segmentos cargados en "
+                  f"{time.perf_counter() - start:.2f}s")
+
+    def __len__(self):
+        return len(self._sources)
+
+    def _index(self, source, target, keys):
+        seg = self._ids.get(source)
+        if seg is None:
+            seg = len(self._sources)
+            self._sources.append(source)
+            self._targets.append(target)
+            self._ids[source] = seg
+            for band, key in zip(self._bands, keys):
+                bucket = band.get(key)
+                if bucket is None:
+                    band[key] = seg
+                elif isinstance(bucket, list):
+                    bucket.append(seg)
+                else:
+                    band[key] = [bucket, seg]
+        else:
+            self._targets[seg] = target
+        term = glossary_term(source, target, self.term_min_len, self.term_max_len)
+        if term:
+            self._terms[term[0]] = term[1]
+
+    def add(self, text, translation):
+        """Guardar (o corregir) la traducción de un texto"""
+        source = normalize(text)
+        translation = translation.strip()
+        if not source or not translation:
+            return
+        with self._lock:
+            seg = self._ids.get(source)
+            if seg is not None and self._targets[seg] == translation:
+                return
+            sig = signature(source)
+            self._index(source, translation, band_keys(sig)[0].tolist())
+            self._conn.execute("INSERT OR REPLACE INTO segments (source, target, signature) VALUES (?, ?, ?)",
+                               (source, translation, sig.tobytes()))
+            self._conn.commit()
+
+    def lookup(self, text):
+        """Traducción guardada de un texto igual o casi igual o None
+
+        Casi igual: similitud >= threshold y como mucho una diferencia por cada
+        chars_per_difference caracteres (ninguna en las frases cortas).
+        """
+        source = normalize(text)
+        if not source:
+            return None
+        max_differences = len(source) // self.chars_per_difference
+        with self._lock:
+            seg = self._ids.get(source)
+            if seg is not None:
+                self.hits += 1
+                return Match(source, self._targets[seg], 1.0)
+            if not max_differences:
+                self.misses += 1
+                return None
+
+            votes = Counter()
+            for band, key in zip(self._bands, band_keys(signature(source))[0].tolist()):
+                bucket = band.get(key)
+                if isinstance(bucket, list):
+                    votes.update(bucket)
+                elif bucket is not None:
+                    votes[bucket] += 1
+            best = None
+            for seg, _ in votes.most_common(MAX_CANDIDATES):
+                candidate = self._sources[seg]
+                if abs(len(candidate) - len(source)) > max_differences:
+                    continue
+                matcher = SequenceMatcher(None, source, candidate, autojunk=False)
+                if matcher.real_quick_ratio() < self.threshold or matcher.quick_ratio() < self.threshold:
+                    continue
+                matches = sum(block.size for block in matcher.get_matching_blocks())
+                if max(len(source), len(candidate)) - matches > max_differences:
+                    continue
+                score = 2 * matches / (len(source) + len(candidate))
+                if score >= self.threshold and (best is None or score > best.score):
+                    best = Match(candidate, self._targets[seg], score)
+            if best:
+                self.fuzzy_hits += 1
+            else:
+                self.misses += 1
+            return best
+
+    def glossary(self, text):
+        """Entradas cortas contenidas en el texto, de la más larga a la más corta y sin solaparse"""
+        source = normalize(text)
+        found = []
+        with self._lock:
+            used = [False] * len(source)
+            for length in range(min(self.term_max_len, len(source) - 1), self.term_min_len - 1, -1):
+                for i in range(len(source) - length + 1):
+                    if any(used[i:i + length]):
+                        continue
+                    term = source[i:i + length]
+                    target = self._terms.get(term)
+                    if target is not None:
+                        found.append((term, target))
+                        used[i:i + length] = [True] * length
+                        if len(found) >= self.max_terms:
+                            return found
+        return found
+
+    def stats(self):
+        return {"segments": len(self._sources), "hits": self.hits, "fuzzy_hits": self.fuzzy_hits,
+                "misses": self.misses}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
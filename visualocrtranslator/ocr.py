@@ -0,0 +1,462 @@
+"""Reconocimiento de texto con Tesseract"""
+import os
+import json
+import time
+import queue
+import threading
+from collections import Counter, namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+import pytesseract
+
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+from .cache import ResultCache
+from .preprocess import preprocess_image, to_gray
+
+# Configuración de Tesseract
+posibles_rutas = [
+    r"C:\Program Files\Tesseract-OCR\tesseract.exe",
+    r"C:\Program Files (x86)\Tesseract-OCR\tesseract.exe",
+    r"C:\Users\home\AppData\Local\Programs\Tesseract-OCR\tesseract.exe"
+]
+for ruta in posibles_rutas:
+    if os.path.exists(ruta):
+        pytesseract.pytesseract.tesseract_cmd = ruta
+        break
+
+DEFAULT_OCR_CONFIG = {
+    'lang': 'jpn',
+    'psm': 6,
+    'config': '--oem 3 -c preserve_interword_spaces=1',
+    # Modos alternativos que se prueban en paralelo si el primero no devuelve texto
+    'fallback_psms': [1, 3, 4, 7, 8, 11, 12],
+    # 'tesserocr' (motor persistente en el proceso), 'pytesseract' (un proceso por llamada) o 'auto'
+    'backend': 'auto',
+    # Calidad mínima (0-100) para enviar el texto a traducir; 0 acepta cualquier texto.
+    # Conservadora hasta calibrarla: solo descarta lecturas casi sin confianza
+    'min_quality': 30,
+    # Preprocesamiento alternativo que se prueba si la calidad no llega al mínimo
+    'retry_preprocess': {'enhance_contrast': True, 'threshold': True},
+    # Texto vertical (bocadillos de manga): 'auto' decide por región, o fijar 'horizontal'/'vertical'
+    'orientation': 'auto',
+    'vertical_lang': 'jpn_vert',
+    'vertical_psm': 5
+}
+
+HORIZONTAL, VERTICAL = "horizontal", "vertical"
+
+# Resultado del OCR de una región; dropped indica texto descartado por baja calidad
+OcrResult = namedtuple("OcrResult", "text quality psm dropped")
+
+
+def _is_punctuation(char):
+    """Puntuación japonesa y de ancho completo (「」、。！？…), que no cuenta como ruido"""
+    code = ord(char)
+    return (0x3000 <= code <= 0x303F or 0xFF01 <= code <= 0xFF0F or 0xFF1A <= code <= 0xFF20
+            or 0xFF3B <= code <= 0xFF40 or 0xFF5B <= code <= 0xFF65 or char in "…‥・♪♡♥!?")
+
+
+def region_quality(text, confidence):
+    """Calidad 0-100 de la región: confianza media ponderada por la proporción de caracteres útiles
+
+    El ruido y los trazos de las ilustraciones suelen dar símbolos sueltos, no kana ni kanji.
+    La puntuación japonesa queda fuera de la proporción: un 「はい」 bien leído no es ruido.
+    """
+    chars = [c for c in text if not c.isspace() and not _is_punctuation(c)]
+    if not chars:
+        # Solo puntuación (p. ej. «！？»): cuenta la confianza de Tesseract
+        return float(confidence) if text.strip() else 0.0
+    useful = sum(1 for c in chars if c.isalnum())
+    return confidence * useful / len(chars)
+
+
+def _words_to_result(words, confidences):
+    """Texto y confianza media (ponderada por caracteres) a partir de la salida de image_to_data"""
+    text, weighted = [], 0.0
+    for word, conf in zip(words, confidences):
+        word, conf = str(word).strip(), float(conf)
+        if word and conf >= 0:
+            text.append(word)
+            weighted += conf * len(word)
+    text = "".join(text)
+    return text, weighted / len(text) if text else 0.0
+
+
+def _parse_tesseract_config(config):
+    """Separar --oem y las variables -c de una cadena de configuración de Tesseract"""
+    oem, variables = None, {}
+    parts = config.split()
+    for i, part in enumerate(parts):
+        if part == "--oem" and i + 1 < len(parts):
+            oem = int(parts[i + 1])
+        elif part == "-c" and i + 1 < len(parts) and "=" in parts[i + 1]:
+            name, value = parts[i + 1].split("=", 1)
+            variables[name] = value
+    return oem, variables
+
+
+def _tessdata_path():
+    """Carpeta tessdata junto al ejecutable de Tesseract configurado, si existe"""
+    path = os.path.join(os.path.dirname(pytesseract.pytesseract.tesseract_cmd), "tessdata")
+    return path if os.path.isdir(path) else None
+
+
+class PytesseractBackend:
+    """Un proceso de tesseract por llamada: siempre disponible, pero carga el modelo cada vez"""
+
+    name = "pytesseract"
+
+    def __init__(self, lang):
+        self.lang = lang
+
+    def image_to_string(self, image, psm, extra_config='--oem 3', lang=None):
+        return pytesseract.image_to_string(image, lang=lang or self.lang, config=f'--psm {psm} {extra_config}')
+
+    def image_to_data(self, image, psm, extra_config='--oem 3', lang=None):
+        """(texto, confianza media 0-100) en una sola llamada a tesseract"""
+        data = pytesseract.image_to_data(image, lang=lang or self.lang, config=f'--psm {psm} {extra_config}',
+                                         output_type=pytesseract.Output.DICT)
+        return _words_to_result(data['text'], data['conf'])
+
+    def close(self):
+        pass
+
+
+class TesserocrBackend:
+    """Motores de Tesseract dentro del proceso que mantienen el modelo cargado entre llamadas
+
+    Cada motor solo se puede usar desde una hebra a la vez, así que se reparten con un
+    pool por idioma (p. ej. jpn y jpn_vert). Las imágenes se pasan como buffer en
+    memoria, sin archivos temporales.
+    """
+
+    name = "tesserocr"
+
+    def __init__(self, lang, config='', pool_size=2):
+        if tesserocr is None:
+            raise RuntimeError("tesserocr no está instalado")
+        self.lang = lang
+        self.oem, self.variables = _parse_tesseract_config(config)
+        self.path = _tessdata_path()
+        self.pool_size = pool_size
+        self._pools = {}  # idioma -> motores libres
+        self._lock = threading.Lock()
+        # Crear el primer motor ya: si falta el modelo, el error aparece aquí y no en el primer OCR
+        self._release(self.lang, self._create(self.lang))
+
+    def _pool(self, lang):
+        with self._lock:
+            if lang not in self._pools:
+                self._pools[lang] = queue.LifoQueue(maxsize=self.pool_size)
+            return self._pools[lang]
+
+    def _create(self, lang):
+        kwargs = {'lang': lang}
+        if self.path:
+            kwargs['path'] = self.path
+        if self.oem is not None:
+            kwargs['oem'] = tesserocr.OEM(self.oem)
+        api = tesserocr.PyTessBaseAPI(**kwargs)
+        for name, value in self.variables.items():
+            api.SetVariable(name, value)
+        return api
+
+    def _acquire(self, lang):
+        try:
+            return self._pool(lang).get_nowait()
+        except queue.Empty:
+            return self._create(lang)
+
+    def _release(self, lang, api):
+        try:
+            self._pool(lang).put_nowait(api)
+        except queue.Full:
+            api.End()
+
+    def _run(self, image, psm, lang, read, extra_config=None):
+        """Reconocer con el PSM y las variables -c de extra_config, restaurándolas al terminar
+
+        --oem solo se puede fijar al crear el motor, así que el de extra_config se ignora.
+        """
+        gray = np.ascontiguousarray(to_gray(image))
+        height, width = gray.shape
+        lang = lang or self.lang
+        _, variables = _parse_tesseract_config(extra_config or "")
+        api = self._acquire(lang)
+        saved = {}
+        try:
+            for name, value in variables.items():
+                previous = api.GetVariableAsString(name)
+                if previous != value:
+                    saved[name] = previous
+                    api.SetVariable(name, value)
+            api.SetPageSegMode(psm)
+            api.SetImageBytes(gray.tobytes(), width, height, 1, width)
+            return read(api)
+        finally:
+            for name, value in saved.items():
+                api.SetVariable(name, value)
+            self._release(lang, api)
+
+    @staticmethod
+    def _read_words(api):
+        """Palabras y confianzas como las de pytesseract.image_to_data (MeanTextConf usa otra escala)"""
+        api.Recognize()
+        words, confidences = [], []
+        iterator = api.GetIterator()
+        if iterator is not None:
+            level = tesserocr.RIL.WORD
+            for word in tesserocr.iterate_level(iterator, level):
+                words.append(word.GetUTF8Text(level) or "")
+                confidences.append(word.Confidence(level))
+        return _words_to_result(words, confidences)
+
+    def image_to_string(self, image, psm, extra_config=None, lang=None):
+        """OCR con el PSM y las variables -c indicadas"""
+        return self._run(image, psm, lang, lambda api: api.GetUTF8Text(), extra_config)
+
+    def image_to_data(self, image, psm, extra_config=None, lang=None):
+        """(texto, confianza media 0-100 ponderada por caracteres) de la misma pasada de reconocimiento"""
+        return self._run(image, psm, lang, self._read_words, extra_config)
+
+    def close(self):
+        with self._lock:
+            pools = list(self._pools.values())
+        for pool in pools:
+            while True:
+                try:
+                    pool.get_nowait().End()
+                except queue.Empty:
+                    break
+
+
+def create_backend(config, pool_size=2):
+    """Motor persistente si está disponible (o se pide explícitamente); si no, pytesseract"""
+    backend = config.get('backend', 'auto')
+    if backend in ('auto', 'tesserocr') and (tesserocr is not None or backend == 'tesserocr'):
+        try:
+            return TesserocrBackend(config['lang'], config['config'], pool_size=pool_size)
+        except Exception as e:
+            if backend == 'tesserocr':
+                raise
+            print(f"No se pudo iniciar tesserocr, se usa pytesseract: {e}")
+    return PytesseractBackend(config['lang'])
+
+
+class TextRecognizer:
+    """OCR de recortes con caché por contenido, orientación por región y búsqueda paralela de PSM"""
+
+    # Proporción alto/ancho a partir de la cual la orientación se decide sin sondear
+    VERTICAL_RATIO = 1.5
+    HORIZONTAL_RATIO = 1 / 1.5
+    # Sondeos necesarios (y mayoría) para dar por conocida la orientación del documento
+    MIN_VOTES = 3
+    MAJORITY = 0.75
+
+    def __init__(self, config=None, cache=None, verbose=True):
+        self.config = dict(config or DEFAULT_OCR_CONFIG)
+        self.cache = cache
+        self.verbose = verbose
+        workers = min(len(self.config['fallback_psms']) + 2, os.cpu_count() or 1)
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        # Un motor por hebra del pool más el de la llamada principal
+        self.backend = create_backend(self.config, pool_size=workers + 1)
+        self.psm_stats = Counter()
+        self.skipped = 0  # Regiones descartadas por baja calidad (llamadas al modelo evitadas)
+        self.orientation_votes = Counter()  # Resultado de los sondeos del documento actual
+        self.orientation_stats = Counter()  # Cómo se decidió la orientación de cada región
+        self.vertical_available = True
+        self.regions = 0
+        self.tesseract_calls = 0
+        self._stats_lock = threading.Lock()
+
+    def start_document(self):
+        """Olvidar la orientación aprendida en el documento anterior"""
+        self.orientation_votes.clear()
+
+    def recognize(self, crop, preprocess_config):
+        """Texto del recorte ("" si no hay texto o se descartó por baja calidad)"""
+        return self.analyze(crop, preprocess_config).text
+
+    def analyze(self, crop, preprocess_config):
+        """OCR del recorte con caché por contenido, reintentos y filtro de calidad"""
+        key = None
+        if self.cache:
+            key = ResultCache.ocr_key(crop, preprocess_config, self.config['lang'],
+                                      [self.config['psm'], self.config['config'], self.config['fallback_psms'],
+                                       self.config['min_quality'], self.config['retry_preprocess'],
+                                       self.config['orientation'], self.config['vertical_lang'],
+                                       self.config['vertical_psm'], self.backend.name, "resultado"])
+            cached = self.cache.get("ocr", key)
+            if cached is not None:
+                # Se guarda también la calidad: un descarte sigue siéndolo al volver a seleccionarlo
+                cached = json.loads(cached)
+                if cached["dropped"]:
+                    self.skipped += 1
+                return OcrResult(cached["text"], cached["quality"], cached["psm"], cached["dropped"])
+
+        # Aplicar preprocesamiento solo al área seleccionada si hay configuraciones activas
+        original = crop
+        if any(preprocess_config.values()):
+            crop = preprocess_image(crop, preprocess_config)
+
+        calls_before = self.tesseract_calls
+        start = time.perf_counter()
+        timings = {}
+        orientation, decided_by = self._orientation(crop)
+        if orientation is None:
+            text_jp, quality, psm, orientation = self._probe(crop, timings)
+        else:
+            lang, psm = self._route(orientation)
+            text_jp, quality = self._ocr_with_psm(crop, psm, self.config['config'], lang)
+            psm = self._label(orientation, psm)
+            timings[psm] = time.perf_counter() - start
+        self.orientation_stats[decided_by] += 1
+
+        if not self._acceptable(text_jp, quality):
+            text_jp, quality, psm = self._retry(original, crop, preprocess_config, orientation,
+                                                (text_jp, quality, psm), timings)
+
+        # Texto de baja calidad: no merece una llamada al modelo
+        dropped = bool(text_jp.strip()) and not self._acceptable(text_jp, quality)
+        if dropped:
+            self.skipped += 1
+            text_jp = ""
+        elif text_jp.strip():
+            self.psm_stats[psm] += 1
+        with self._stats_lock:
+            self.regions += 1
+        # Copia: los intentos descartados pueden seguir terminando en segundo plano
+        timings = dict(timings)
+        if self.verbose:
+            chosen = f"descartado (calidad {quality:.0f} < {self.config['min_quality']})" if dropped else \
+                f"psm elegido {psm if text_jp.strip() else None} (calidad {quality:.0f})"
+            print(f"OCR ({self.backend.name}, {orientation} por {decided_by}): {chosen} en "
+                  f"{time.perf_counter() - start:.2f}s con {self.tesseract_calls - calls_before} llamadas "
+                  f"(tiempos por intento: {', '.join(f'{p}={t:.2f}s' for p, t in timings.items())}; "
+                  f"aciertos acumulados: {dict(self.psm_stats)}; descartados: {self.skipped}; "
+                  f"media de llamadas por región: {self.tesseract_calls / self.regions:.1f})")
+
+        if key:
+            self.cache.put("ocr", key, json.dumps({"text": text_jp, "quality": quality, "psm": psm,
+                                                   "dropped": dropped}, ensure_ascii=False))
+        return OcrResult(text_jp, quality, psm, dropped)
+
+    def _acceptable(self, text, quality):
+        return bool(text.strip()) and quality >= self.config['min_quality']
+
+    def _route(self, orientation):
+        """Idioma y PSM con los que se reconoce cada orientación"""
+        if orientation == VERTICAL:
+            return self.config['vertical_lang'], self.config['vertical_psm']
+        return self.config['lang'], self.config['psm']
+
+    @staticmethod
+    def _label(orientation, psm):
+        return f"v{psm}" if orientation == VERTICAL else psm
+
+    def document_orientation(self):
+        """Orientación dominante del documento según los sondeos, o None si aún no está clara"""
+        total = sum(self.orientation_votes.values())
+        if total < self.MIN_VOTES:
+            return None
+        orientation, votes = self.orientation_votes.most_common(1)[0]
+        return orientation if votes / total >= self.MAJORITY else None
+
+    def _orientation(self, crop):
+        """(orientación o None si hay que sondear, motivo de la decisión) sin llamar a Tesseract"""
+        forced = self.config['orientation']
+        if forced in (HORIZONTAL, VERTICAL):
+            return forced, "configuración"
+        if not self.vertical_available:
+            return HORIZONTAL, "configuración"
+        ratio = crop.height / max(1, crop.width)
+        if ratio >= self.VERTICAL_RATIO:
+            return VERTICAL, "proporción"
+        if ratio <= self.HORIZONTAL_RATIO:
+            return HORIZONTAL, "proporción"
+        learned = self.document_orientation()
+        if learned:
+            return learned, "documento"
+        return None, "sondeo"
+
+    def _probe(self, crop, timings):
+        """Reconocer en horizontal y en vertical a la vez y quedarse con el de mayor calidad"""
+        start = time.perf_counter()
+
+        def run(orientation):
+            lang, psm = self._route(orientation)
+            text, quality = self._ocr_with_psm(crop, psm, self.config['config'], lang)
+            label = self._label(orientation, psm)
+            timings[label] = time.perf_counter() - start
+            return text, quality, label, orientation
+
+        results = list(self.pool.map(run, (HORIZONTAL, VERTICAL)))
+        best = max(results, key=lambda result: (bool(result[0].strip()), result[1]))
+        if best[0].strip():
+            self.orientation_votes[best[3]] += 1
+        return best
+
+    def _ocr_with_psm(self, crop, psm, extra_config='--oem 3', lang=None):
+        """(texto sin espacios ni saltos de línea, calidad de la región)"""
+        with self._stats_lock:
+            self.tesseract_calls += 1
+        lang = lang or self.config['lang']
+        try:
+            text, confidence = self.backend.image_to_data(crop, psm, extra_config, lang)
+        except Exception as e:
+            if lang != self.config['vertical_lang']:
+                raise
+            # Sin el modelo vertical instalado se sigue solo en horizontal
+            if self.vertical_available:
+                print(f"OCR vertical no disponible ({lang}): {e}")
+            self.vertical_available = False
+            return "", 0.0
+        text = text.replace(" ", "").replace("\n", "")
+        return text, region_quality(text, confidence)
+
+    def _retry(self, original, crop, preprocess_config, orientation, best, timings):
+        """Probar a la vez los PSM alternativos, otro preprocesamiento y la otra orientación
+
+        Devuelve el primer resultado aceptable o, si ninguno lo es, el de mayor calidad.
+        """
+        start = time.perf_counter()
+        lang, psm = self._route(orientation)
+
+        def run(label, image, psm, extra_config, lang):
+            text, quality = self._ocr_with_psm(image() if callable(image) else image, psm, extra_config, lang)
+            timings[label] = time.perf_counter() - start
+            return text, quality, label
+
+        tasks = []
+        if orientation == HORIZONTAL:
+            tasks += [(fallback, crop, fallback, '--oem 3', lang) for fallback in self.config['fallback_psms']]
+        retry_config = dict(preprocess_config, **self.config['retry_preprocess'])
+        if retry_config != preprocess_config:
+            tasks.append((f"{self._label(orientation, psm)}+pre", lambda: preprocess_image(original, retry_config),
+                          psm, self.config['config'], lang))
+        # La orientación deducida de la forma de la región puede estar equivocada
+        if self.config['orientation'] == 'auto' and self.vertical_available:
+            other = VERTICAL if orientation == HORIZONTAL else HORIZONTAL
+            other_lang, other_psm = self._route(other)
+            if self._label(other, other_psm) not in timings:
+                tasks.append((self._label(other, other_psm), crop, other_psm, self.config['config'], other_lang))
+
+        futures = [self.pool.submit(run, *task) for task in tasks]
+        rank = lambda result: (bool(result[0].strip()), result[1])
+        try:
+            for future in as_completed(futures):
+                result = future.result()
+                if self._acceptable(result[0], result[1]):
+                    return result
+                best = max(best, result, key=rank)
+        finally:
+            # Los que aún no empezaron se cancelan; los que están en curso se ignoran
+            for future in futures:
+                future.cancel()
+        return best
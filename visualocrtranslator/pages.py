@@ -0,0 +1,336 @@
+"""Rasterizado bajo demanda de las páginas del PDF y capas derivadas"""
+import io
+import os
+import subprocess
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+from PIL import Image
+from pdf2image import convert_from_path, pdfinfo_from_path
+
+from .preprocess import DESKEW_MIN_ANGLE, estimate_skew_angle, preprocess_batch, to_gray
+
+# Configuración de rasterizado bajo demanda
+DEFAULT_RENDER_CONFIG = {
+    # Resolución de la vista: basta para leer y ahorra memoria y tiempo de carga
+    'dpi': 120,
+    # Resolución a la que se vuelve a rasterizar cada región para el OCR (300-400)
+    'ocr_dpi': 300,
+    # Resolución de las páginas incrustadas en el PDF exportado
+    'export_dpi': 300,
+    'prefetch': 2,
+    'max_cached_pages': 8
+}
+
+
+def default_poppler_path():
+    """Ruta de Poppler en Windows si está instalada en la ubicación habitual"""
+    ruta = r"C:\Program Files\poppler\Library\bin"
+    return ruta if os.path.exists(ruta) else None
+
+
+def _unrotation(angle, size):
+    """Transformación afín de la vista enderezada por deskew_image a la página original (o None)"""
+    if abs(angle) <= DESKEW_MIN_ANGLE:
+        return None
+    w, h = size
+    return cv2.invertAffineTransform(cv2.getRotationMatrix2D((w // 2, h // 2), angle, 1.0))
+
+
+def unrotate_box(box, angle, size):
+    """Caja de la vista enderezada (página de tamaño size girada angle grados) llevada a la página original
+
+    Devuelve el rectángulo que contiene la región girada, recortado a la página.
+    """
+    inverse = _unrotation(angle, size)
+    if inverse is None:
+        return box
+    x1, y1, x2, y2 = box
+    corners = np.array([[x1, y1, 1], [x2, y1, 1], [x1, y2, 1], [x2, y2, 1]], dtype=np.float64) @ inverse.T
+    w, h = size
+    return (max(0, int(corners[:, 0].min())), max(0, int(corners[:, 1].min())),
+            min(w, int(np.ceil(corners[:, 0].max()))), min(h, int(np.ceil(corners[:, 1].max()))))
+
+
+class PageProvider:
+    """Rasteriza páginas del PDF bajo demanda y mantiene una caché LRU acotada"""
+
+    def __init__(self, path, poppler_path=None, dpi=200, prefetch=2, max_cached=8):
+        self.path = path
+        self.poppler_path = poppler_path
+        self.dpi = dpi
+        self.prefetch = prefetch
+        # La caché debe poder contener la página actual más la ventana de precarga
+        self.max_cached = max(max_cached, 2 * prefetch + 1)
+        self.page_count = pdfinfo_from_path(path, poppler_path=poppler_path)["Pages"]
+        self._cache = OrderedDict()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def _convert(self, first, last, dpi):
+        """Rasterizar un rango de páginas (índices base 0, ambos incluidos)"""
+        return convert_from_path(self.path, dpi=dpi, first_page=first + 1,
+                                 last_page=last + 1, poppler_path=self.poppler_path)
+
+    def _render_range(self, first, last):
+        """Rasterizar un rango y guardarlo en la caché
+
+        Devuelve {índice: imagen} de lo rasterizado, o None si otra hebra ya se encarga.
+        """
+        with self._lock:
+            events = {}
+            for idx in range(first, last + 1):
+                if idx not in self._cache and idx not in self._in_flight:
+                    events[idx] = self._in_flight[idx] = threading.Event()
+        if not events:
+            return None
+        first, last = min(events), max(events)
+        try:
+            images = {first + offset: img for offset, img in enumerate(self._convert(first, last, self.dpi))}
+            with self._lock:
+                for idx, img in images.items():
+                    self._store(idx, img)
+            return images
+        finally:
+            with self._lock:
+                for idx, event in events.items():
+                    self._in_flight.pop(idx, None)
+                    event.set()
+
+    def _store(self, idx, img):
+        """Guardar una página en la caché expulsando las menos usadas (requiere el lock)"""
+        self._cache[idx] = img
+        self._cache.move_to_end(idx)
+        while len(self._cache) > self.max_cached:
+            self._cache.popitem(last=False)
+
+    def is_cached(self, idx):
+        with self._lock:
+            return idx in self._cache
+
+    def get_page(self, idx):
+        """Devolver la página idx, rasterizándola si no está en caché"""
+        while True:
+            with self._lock:
+                if idx in self._cache:
+                    self._cache.move_to_end(idx)
+                    return self._cache[idx]
+                event = self._in_flight.get(idx)
+            if event is not None:
+                # Otra hebra ya la está rasterizando (p. ej. la precarga)
+                event.wait()
+                with self._lock:
+                    if idx in self._cache:
+                        self._cache.move_to_end(idx)
+                        return self._cache[idx]
+            images = self._render_range(idx, idx)
+            if images is not None:
+                # Página dañada o pdftoppm sin salida: no reintentar indefinidamente
+                if idx not in images:
+                    raise RuntimeError(f"No se pudo rasterizar la página {idx + 1}")
+                return images[idx]
+
+    def prefetch_around(self, idx):
+        """Rasterizar en segundo plano las páginas vecinas que falten en caché"""
+        if self.prefetch <= 0:
+            return
+        first = max(0, idx - 1)
+        last = min(self.page_count - 1, idx + self.prefetch)
+        with self._lock:
+            missing = [i for i in range(first, last + 1)
+                       if i != idx and i not in self._cache and i not in self._in_flight]
+        if not missing:
+            return
+
+        def worker():
+            try:
+                # Una sola llamada a pdftoppm por bloque contiguo de páginas
+                start = prev = missing[0]
+                for i in missing[1:] + [None]:
+                    if i is None or i != prev + 1:
+                        self._render_range(start, prev)
+                        start = i
+                    prev = i
+            except Exception as e:
+                print(f"Error en precarga de páginas: {e}")
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def render_region(self, idx, box, dpi, angle=0):
+        """Rasterizar solo un rectángulo de la página a otra resolución (recorte de pdftoppm)
+
+        box está en píxeles de la página a self.dpi, como las coordenadas de la vista. Si
+        la vista está enderezada (angle de deskew_image), se rasteriza la zona girada de la
+        página original y se endereza igual que la vista.
+        """
+        size = self.get_page(idx).size
+        inverse = _unrotation(angle, size)
+        if inverse is None:
+            return self._render_rect(idx, box, dpi)
+        source = unrotate_box(box, angle, size)
+        image = self._render_rect(idx, source, dpi)
+        # Píxel (X, Y) del recorte enderezado -> píxel del recorte rasterizado de la página original
+        scale = dpi / self.dpi
+        x1, y1, x2, y2 = box
+        linear, offset = inverse[:, :2], inverse[:, 2]
+        origin = np.array([int(source[0] * scale), int(source[1] * scale)])
+        shift = scale * (linear @ np.array([x1, y1]) + offset) - origin
+        size = (max(1, round((x2 - x1) * scale)), max(1, round((y2 - y1) * scale)))
+        return image.transform(size, Image.AFFINE,
+                               (linear[0, 0], linear[0, 1], shift[0], linear[1, 0], linear[1, 1], shift[1]),
+                               resample=Image.BICUBIC, fillcolor="white")
+
+    def _render_rect(self, idx, box, dpi):
+        scale = dpi / self.dpi
+        x1, y1, x2, y2 = box
+        x, y = int(x1 * scale), int(y1 * scale)
+        width, height = max(1, round((x2 - x1) * scale)), max(1, round((y2 - y1) * scale))
+        command = os.path.join(self.poppler_path, "pdftoppm") if self.poppler_path else "pdftoppm"
+        # Sin raíz de salida pdftoppm escribe la imagen en stdout: no hay archivos temporales
+        result = subprocess.run([command, "-f", str(idx + 1), "-l", str(idx + 1), "-r", str(dpi),
+                                 "-x", str(x), "-y", str(y), "-W", str(width), "-H", str(height), self.path],
+                                capture_output=True, check=True,
+                                creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0))
+        image = Image.open(io.BytesIO(result.stdout))
+        image.load()
+        return image
+
+    def render_thumbnails(self, first, last, size=(150, 200), dpi=30):
+        """Generar miniaturas de un rango de páginas a baja resolución"""
+        thumbs = self._convert(first, last, dpi)
+        for thumb in thumbs:
+            thumb.thumbnail(size)
+        return thumbs
+
+
+class PageStore:
+    """Páginas copy-on-write: un original inmutable por página y capas derivadas aparte"""
+
+    def __init__(self, provider, max_processed=6):
+        self.provider = provider
+        self.max_processed = max_processed
+        self._processed = OrderedDict()  # (idx, configuración) -> imagen procesada, en orden LRU
+        self._in_flight = {}             # (idx, configuración) -> Event mientras se procesa
+        self._lock = threading.Lock()
+        # Una sola hebra de fondo para no competir con la página visible
+        self._background = ThreadPoolExecutor(max_workers=1)
+        self._patches = {}    # idx -> [(caja, color de fondo)]
+        self._regions = {}    # idx -> regiones de texto detectadas
+        self._skew_angles = {}  # idx -> inclinación estimada (una vez por documento)
+
+    def original(self, idx):
+        """Original de la página (compartido, nunca se debe modificar)"""
+        return self.provider.get_page(idx)
+
+    def base(self, idx, config, process):
+        """Imagen a mostrar sin parches: el original o su variante procesada (memoizada)"""
+        if not any(config.values()):
+            return self.original(idx)
+        key = self.base_key(idx, config)
+        while True:
+            with self._lock:
+                if key in self._processed:
+                    self._processed.move_to_end(key)
+                    return self._processed[key]
+                event = self._in_flight.get(key)
+                if event is None:
+                    event = self._in_flight[key] = threading.Event()
+                    break
+            # La hebra de fondo ya está procesando esta página con esta configuración
+            event.wait()
+        try:
+            skew_angle = self.skew_angle(idx) if config.get('deskew') else None
+            processed = process(self.original(idx), dict(config), skew_angle)
+            with self._lock:
+                self._processed[key] = processed
+                while len(self._processed) > self.max_processed:
+                    self._processed.popitem(last=False)
+            return processed
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            event.set()
+
+    def skew_angle(self, idx):
+        """Inclinación de la página, estimada sobre el original una sola vez"""
+        with self._lock:
+            if idx in self._skew_angles:
+                return self._skew_angles[idx]
+        angle = estimate_skew_angle(to_gray(self.original(idx)))
+        with self._lock:
+            self._skew_angles[idx] = angle
+        return angle
+
+    def prefetch_processed(self, idx, config, radius=1):
+        """Procesar en segundo plano las páginas vecinas con la configuración actual, en un solo lote"""
+        if not any(config.values()):
+            return
+        config = dict(config)
+        neighbours = []
+        with self._lock:
+            for neighbour in range(idx - radius, idx + radius + 1):
+                if neighbour == idx or not 0 <= neighbour < self.provider.page_count:
+                    continue
+                key = self.base_key(neighbour, config)
+                if key not in self._processed and key not in self._in_flight:
+                    neighbours.append(neighbour)
+        if neighbours:
+            self._background.submit(self._prefetch_batch, neighbours, config)
+
+    def _prefetch_batch(self, indices, config):
+        # Reservar las páginas al empezar: si el usuario llega antes a una, base() la procesa él
+        claimed = []
+        with self._lock:
+            for idx in indices:
+                key = self.base_key(idx, config)
+                if key not in self._processed and key not in self._in_flight:
+                    claimed.append((idx, key, self._in_flight.setdefault(key, threading.Event())))
+        try:
+            images = [self.original(idx) for idx, _, _ in claimed]
+            angles = [self.skew_angle(idx) if config.get('deskew') else None for idx, _, _ in claimed]
+            processed, _ = preprocess_batch(images, config, angles)
+            with self._lock:
+                for (_, key, _), image in zip(claimed, processed):
+                    self._processed[key] = image
+                while len(self._processed) > self.max_processed:
+                    self._processed.popitem(last=False)
+        except Exception as e:
+            print(f"Error al preprocesar las páginas {', '.join(str(idx + 1) for idx, _, _ in claimed)}: {e}")
+        finally:
+            with self._lock:
+                for _, key, _ in claimed:
+                    self._in_flight.pop(key, None)
+            for _, _, event in claimed:
+                event.set()
+
+    def regions(self, idx, detect):
+        """Regiones de texto de la página, detectadas una sola vez sobre el original"""
+        if idx not in self._regions:
+            self._regions[idx] = detect(self.original(idx))
+        return self._regions[idx]
+
+    @staticmethod
+    def base_key(idx, config):
+        """Clave estable de la imagen base de una página con una configuración dada"""
+        return (idx, tuple(sorted(config.items())) if any(config.values()) else None)
+
+    def add_patch(self, idx, box, fill):
+        """Registrar un parche de traducción (rectángulo relleno) sobre la página"""
+        self._patches.setdefault(idx, []).append((box, fill))
+
+    def remove_patch(self, idx, box, fill):
+        patches = self._patches.get(idx)
+        if patches and (box, fill) in patches:
+            patches.remove((box, fill))
+
+    def clear_patches(self, idx=None):
+        if idx is None:
+            self._patches = {}
+        else:
+            self._patches.pop(idx, None)
+
+    def patches(self, idx):
+        return list(self._patches.get(idx, ()))
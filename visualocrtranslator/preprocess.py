@@ -0,0 +1,182 @@
+"""Filtros de preprocesamiento de imagen para mejorar el OCR"""
+import os
+import time
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+from PIL import Image
+
+# Configuración de preprocesamiento - todas desactivadas por defecto
+DEFAULT_PREPROCESS_CONFIG = {
+    'enhance_contrast': False,
+    'enhance_sharpness': False,
+    'denoise': False,
+    'threshold': False,
+    'deskew': False
+}
+
+# Ángulo mínimo (en grados) a partir del cual merece la pena rotar
+DESKEW_MIN_ANGLE = 0.5
+
+# Pool compartido por todos los lotes (se crea la primera vez que se usa)
+_pool = None
+_pool_lock = threading.Lock()
+
+# Núcleo de enfoque 3x3
+_SHARPEN_KERNEL = np.array([[-1, -1, -1],
+                            [-1, 9, -1],
+                            [-1, -1, -1]])
+
+
+def to_gray(image):
+    """Pasar la imagen PIL directamente a un array en escala de grises"""
+    if image.mode == 'L':
+        return np.asarray(image)
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGB')
+    return cv2.cvtColor(np.asarray(image), cv2.COLOR_RGBA2GRAY if image.mode == 'RGBA' else cv2.COLOR_RGB2GRAY)
+
+
+def preprocess_array(gray, config, timings=None, skew_angle=None):
+    """Cadena de filtros sobre un array en escala de grises; acumula el tiempo de cada etapa
+
+    skew_angle permite reutilizar un ángulo ya estimado para la página.
+    """
+    def stage(name, start):
+        if timings is not None:
+            timings[name] += time.perf_counter() - start
+
+    # 1. Enderezar imagen (deskew)
+    if config['deskew']:
+        start = time.perf_counter()
+        gray = deskew_image(gray, skew_angle)
+        stage('deskew', start)
+
+    # 2. Reducir ruido
+    if config['denoise']:
+        start = time.perf_counter()
+        gray = cv2.GaussianBlur(gray, (3, 3), 0)
+        gray = cv2.medianBlur(gray, 3)
+        stage('denoise', start)
+
+    # 3. Mejorar contraste
+    if config['enhance_contrast']:
+        start = time.perf_counter()
+        # CLAHE (Contrast Limited Adaptive Histogram Equalization)
+        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+        gray = clahe.apply(gray)
+
+        # Ecualización de histograma global
+        gray = cv2.equalizeHist(gray)
+        stage('enhance_contrast', start)
+
+    # 4. Umbralización (binarización)
+    if config['threshold']:
+        start = time.perf_counter()
+        # Usar método adaptativo
+        gray = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                                     cv2.THRESH_BINARY, 11, 2)
+        stage('threshold', start)
+
+    # 5. Mejorar nitidez
+    if config['enhance_sharpness']:
+        start = time.perf_counter()
+        gray = cv2.filter2D(gray, -1, _SHARPEN_KERNEL)
+        stage('enhance_sharpness', start)
+
+    return gray
+
+
+def preprocess_image(image, config, timings=None, skew_angle=None):
+    """Aplicar preprocesamiento a la imagen si hay configuraciones activas"""
+    try:
+        # Verificar si hay alguna configuración activa
+        if not any(config.values()):
+            return image
+
+        start = time.perf_counter()
+        gray = to_gray(image)
+        if timings is not None:
+            timings['to_gray'] += time.perf_counter() - start
+
+        return Image.fromarray(preprocess_array(gray, config, timings, skew_angle))
+
+    except Exception as e:
+        print(f"Error en preprocesamiento: {e}")
+        return image  # Devolver imagen original si hay error
+
+
+def _shared_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix="preprocess")
+        return _pool
+
+
+def preprocess_batch(images, config, skew_angles=None):
+    """Preprocesar varias imágenes en paralelo; devuelve (resultados, tiempos por etapa)
+
+    Se usan hebras de un pool compartido porque OpenCV libera el GIL durante los filtros.
+    skew_angles da la inclinación ya estimada de cada imagen (o None para estimarla).
+    No se debe llamar desde una tarea del propio pool.
+    """
+    images = list(images)
+    timings = Counter()
+    if not any(config.values()):
+        return images, timings
+
+    def run(image, skew_angle):
+        local = Counter()
+        result = preprocess_image(image, config, local, skew_angle)
+        return result, local
+
+    results = []
+    for result, local in _shared_pool().map(run, images, skew_angles or [None] * len(images)):
+        results.append(result)
+        timings.update(local)
+    return results, timings
+
+
+def format_timings(timings):
+    """Texto legible con el tiempo acumulado por etapa"""
+    return ", ".join(f"{name}={seconds * 1000:.0f}ms" for name, seconds in timings.most_common())
+
+
+def estimate_skew_angle(gray, max_side=1000):
+    """Estimar la inclinación del texto sobre una copia reducida (mediana de las líneas de Hough)"""
+    (h, w) = gray.shape[:2]
+    scale = min(1.0, max_side / max(h, w))
+    small = gray if scale == 1.0 else cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    # Los ángulos no cambian al escalar; los umbrales de longitud sí
+    min_length = max(20, int(100 * scale))
+    edges = cv2.Canny(small, 50, 150, apertureSize=3)
+    lines = cv2.HoughLinesP(edges, 1, np.pi/180, min_length, minLineLength=min_length, maxLineGap=10)
+    if lines is None:
+        return 0.0
+
+    # Todos los ángulos de una vez, sin recorrer las líneas en Python
+    segments = lines.reshape(-1, 4).astype(np.float64)
+    angles = np.degrees(np.arctan2(segments[:, 3] - segments[:, 1], segments[:, 2] - segments[:, 0]))
+    angles = angles[np.abs(angles) < 45]
+    return float(np.median(angles)) if angles.size else 0.0
+
+
+def deskew_image(image, angle=None):
+    """Enderezar imagen basado en el ángulo del texto (se estima si no se indica)"""
+    try:
+        if angle is None:
+            angle = estimate_skew_angle(image)
+        if abs(angle) <= DESKEW_MIN_ANGLE:
+            return image
+        (h, w) = image.shape[:2]
+        center = (w // 2, h // 2)
+        M = cv2.getRotationMatrix2D(center, angle, 1.0)
+        return cv2.warpAffine(image, M, (w, h),
+                              flags=cv2.INTER_CUBIC,
+                              borderMode=cv2.BORDER_REPLICATE)
+    except:
+        return image
@@ -0,0 +1,169 @@
+"""Proyecto de traducción por documento: regiones, texto original y traducciones de cada página"""
+import os
+import json
+import threading
+import uuid
+
+PROJECT_VERSION = 1
+
+
+def project_path(pdf_path):
+    """Archivo del proyecto junto al PDF (documento.pdf -> documento.vot.json)"""
+    return os.path.splitext(pdf_path)[0] + ".vot.json"
+
+
+def _overlaps(a, b, min_ratio=0.5):
+    """True si la intersección cubre al menos min_ratio de la menor de las dos cajas"""
+    width = min(a[2], b[2]) - max(a[0], b[0])
+    height = min(a[3], b[3]) - max(a[1], b[1])
+    if width <= 0 or height <= 0:
+        return False
+    smaller = min((a[2] - a[0]) * (a[3] - a[1]), (b[2] - b[0]) * (b[3] - b[1]))
+    return width * height >= min_ratio * max(1, smaller)
+
+
+class TranslationProject:
+    """Regiones traducidas de un PDF guardadas en un JSON junto al documento
+
+    Las coordenadas se guardan en píxeles de la página rasterizada a `dpi`; si el
+    archivo se creó con otra resolución se convierten al cargarlo. Las páginas que el
+    modo por lotes o la traducción especulativa procesaron enteras se marcan con
+    "complete"; las que solo tienen regiones elegidas a mano se pueden seguir completando.
+    """
+
+    def __init__(self, pdf_path, dpi=200, path=None):
+        self.pdf_path = pdf_path
+        self.path = path or project_path(pdf_path)
+        self.dpi = dpi
+        self._pages = {}  # idx -> {"width", "height", "regions": [...]}
+        self._lock = threading.Lock()
+        self._dirty = False
+        if os.path.exists(self.path):
+            self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"No se pudo leer el proyecto {self.path}: {e}")
+            return
+        scale = self.dpi / data.get("dpi", self.dpi)
+        for key, page in data.get("pages", {}).items():
+            if scale != 1:
+                page["width"] = round(page["width"] * scale) if page.get("width") else None
+                page["height"] = round(page["height"] * scale) if page.get("height") else None
+                for region in page["regions"]:
+                    region["box"] = [round(v * scale) for v in region["box"]]
+                    if region.get("position"):
+                        region["position"] = [v * scale for v in region["position"]]
+            self._pages[int(key)] = page
+        self._dirty = scale != 1
+
+    def save(self):
+        """Escribir el proyecto de forma atómica si ha cambiado"""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {
+                "version": PROJECT_VERSION,
+                "source": os.path.abspath(self.pdf_path),
+                "dpi": self.dpi,
+                "pages": {str(idx): page for idx, page in sorted(self._pages.items())
+                          if page["regions"] or page.get("complete")},
+            }
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+
+    def pages(self):
+        """Índices de las páginas con regiones guardadas"""
+        with self._lock:
+            return sorted(idx for idx, page in self._pages.items() if page["regions"])
+
+    def is_complete(self, idx):
+        """True si la página ya se procesó entera (no hace falta detectar sus regiones otra vez)"""
+        with self._lock:
+            return bool(self._pages.get(idx, {}).get("complete"))
+
+    def regions(self, idx):
+        with self._lock:
+            page = self._pages.get(idx)
+            return [dict(region) for region in page["regions"]] if page else []
+
+    def add_region(self, idx, box, text, fill, translation, position=None, size=None):
+        """Guardar una región traducida y devolver su identificador"""
+        region = {
+            "id": uuid.uuid4().hex,
+            "box": [int(v) for v in box],
+            "text": text,
+            "fill": list(fill) if isinstance(fill, (list, tuple)) else fill,
+            "translation": translation,
+            "edited": False,
+        }
+        if position is not None:
+            region["position"] = list(position)
+        with self._lock:
+            page = self._pages.setdefault(idx, {"width": None, "height": None, "regions": []})
+            if size:
+                page["width"], page["height"] = size
+            page["regions"].append(region)
+            self._dirty = True
+        return region["id"]
+
+    def update_region(self, idx, region_id, **changes):
+        """Actualizar campos de una región (p. ej. translation o position); True si existe"""
+        with self._lock:
+            for region in self._pages.get(idx, {}).get("regions", []):
+                if region["id"] == region_id:
+                    changed = {k: v for k, v in changes.items() if region.get(k) != v}
+                    if "translation" in changed:
+                        region["edited"] = True
+                    if changed:
+                        region.update(changed)
+                        self._dirty = True
+                    return True
+        return False
+
+    def remove_region(self, idx, region_id):
+        with self._lock:
+            page = self._pages.get(idx)
+            if page:
+                page["regions"] = [r for r in page["regions"] if r["id"] != region_id]
+                self._dirty = True
+
+    def set_page(self, result):
+        """Guardar el resultado de una página procesada entera y marcarla como completa
+
+        Las regiones ya guardadas (p. ej. las elegidas a mano) se conservan y las
+        detectadas que se solapan con ellas se descartan. Devuelve cuántas se añadieron.
+        """
+        with self._lock:
+            page = self._pages.setdefault(result["page"], {"width": None, "height": None, "regions": []})
+            if result.get("width"):
+                page["width"], page["height"] = result["width"], result.get("height")
+            saved = [region["box"] for region in page["regions"]]
+            added = [dict(region, id=uuid.uuid4().hex, edited=False) for region in result["regions"]
+                     if not any(_overlaps(region["box"], box) for box in saved)]
+            page["regions"].extend(added)
+            page["complete"] = True
+            self._dirty = True
+        return len(added)
+
+    def _result(self, idx, page):
+        return {"page": idx, "width": page["width"], "height": page["height"], "dpi": self.dpi,
+                "regions": [dict(region) for region in page["regions"]]}
+
+    def result(self, idx):
+        """Una página en el mismo formato que el modo por lotes, o None si no está guardada"""
+        with self._lock:
+            page = self._pages.get(idx)
+            return self._result(idx, page) if page else None
+
+    def results(self):
+        """Páginas en el mismo formato que el modo por lotes (para exportar)"""
+        with self._lock:
+            return [self._result(idx, page) for idx, page in sorted(self._pages.items())
+                    if page["regions"] or page.get("complete")]
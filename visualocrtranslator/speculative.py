@@ -0,0 +1,129 @@
+"""Traducción especulativa en segundo plano de las páginas siguientes a la visible"""
+import threading
+
+from .detection import detect_text_regions
+
+DEFAULT_SPECULATIVE_CONFIG = {
+    'enabled': False,
+    # Páginas por delante de la visible que se traducen de antemano
+    'lookahead': 2,
+    # Hebras dedicadas: el presupuesto de concurrencia que se le quita al trabajo interactivo
+    'max_workers': 1
+}
+
+
+class SpeculativeTranslator:
+    """Detecta, reconoce y traduce las páginas N+1..N+k y guarda el resultado en el proyecto
+
+    Se detiene entre etapas mientras haya trabajo interactivo (pause/resume) y traduce
+    región a región para no ocupar el modelo con peticiones largas.
+    """
+
+    def __init__(self, page_store, project, recognize, translator, on_page_ready=None,
+                 lookahead=2, max_workers=1):
+        self.page_store = page_store
+        self.project = project
+        # recognize(page_store, idx, caja) -> texto; recibe el documento para no leer el estado de la GUI
+        self.recognize = recognize
+        self.translator = translator
+        self.on_page_ready = on_page_ready
+        self.lookahead = lookahead
+        self.pages_done = 0
+        self._active = threading.Event()
+        self._active.set()
+        self._cond = threading.Condition()
+        self._window = []
+        self._done = set()
+        self._in_progress = set()
+        self._stopped = False
+        for _ in range(max(1, max_workers)):
+            threading.Thread(target=self._worker, daemon=True).start()
+
+    def follow(self, idx, page_count):
+        """Mover la ventana de páginas a traducir detrás de la página visible"""
+        with self._cond:
+            self._window = list(range(idx + 1, min(page_count, idx + 1 + self.lookahead)))
+            self._cond.notify_all()
+
+    def pause(self):
+        self._active.clear()
+
+    def resume(self):
+        self._active.set()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        self._active.set()
+
+    def _proceed(self, idx):
+        """Esperar mientras esté en pausa; False si hay que abandonar la página"""
+        self._active.wait()
+        with self._cond:
+            return not self._stopped and idx in self._window
+
+    def _next_page(self):
+        with self._cond:
+            while not self._stopped:
+                for idx in self._window:
+                    if idx not in self._done and idx not in self._in_progress:
+                        self._in_progress.add(idx)
+                        return idx
+                self._cond.wait()
+        return None
+
+    def _worker(self):
+        while True:
+            idx = self._next_page()
+            if idx is None:
+                return
+            finished = True
+            try:
+                finished = self._process(idx)
+            except Exception as e:
+                print(f"Error en la traducción especulativa de la página {idx + 1}: {e}")
+            with self._cond:
+                self._in_progress.discard(idx)
+                # Una página abandonada a medias se retoma si vuelve a entrar en la ventana
+                if finished:
+                    self._done.add(idx)
+
+    def _process(self, idx):
+        """Traducir una página; False si se abandonó porque salió de la ventana"""
+        if self.project.is_complete(idx):
+            return True  # Ya traducida entera (en el modo por lotes o en otra sesión)
+        if not self._proceed(idx):
+            return False
+        image = self.page_store.original(idx)
+        boxes = self.page_store.regions(idx, detect_text_regions)
+
+        items = []
+        for box in boxes:
+            if not self._proceed(idx):
+                return False
+            text = self.recognize(self.page_store, idx, box)
+            if text.strip():
+                fill = image.crop(box).resize((1, 1)).getpixel((0, 0))
+                items.append((box, text, fill))
+
+        # Los globos de la página comparten conversación: el modelo los ve en orden de lectura
+        translated = []
+        session = self.translator.new_session()
+        for box, text, fill in items:
+            if not self._proceed(idx):
+                return False
+            translation = self.translator.translate(text, session)
+            if translation:
+                translated.append((box, text, fill, translation))
+
+        # set_page descarta las regiones que se solapan con las que eligió el usuario
+        added = self.project.set_page({
+            "page": idx, "width": image.width, "height": image.height,
+            "regions": [{"box": list(box), "text": text, "fill": fill, "translation": translation}
+                        for box, text, fill, translation in translated]})
+        self.pages_done += 1
+        print(f"Traducción especulativa: página {idx + 1} lista ({added} regiones nuevas)")
+        if added and self.on_page_ready:
+            self.on_page_ready(idx)
+        return True
@@ -0,0 +1,83 @@
+"""Texto incrustado en el PDF (PDF digitales o con capa OCR) para evitar Tesseract"""
+import os
+import re
+import html
+import subprocess
+from collections import defaultdict
+
+_PAGE = re.compile(r'<page width="([\d.]+)" height="([\d.]+)"')
+_WORD = re.compile(r'<word xMin="([\d.-]+)" yMin="([\d.-]+)" xMax="([\d.-]+)" yMax="([\d.-]+)">(.*?)</word>')
+
+
+class TextLayer:
+    """Palabras con su caja (en puntos) por página e índice espacial en rejilla para consultas rápidas"""
+
+    def __init__(self, pages, first_page=0, cell=50):
+        self.cell = cell
+        self._words = {}  # idx -> [(x1, y1, x2, y2, texto)] en orden de lectura
+        self._grid = {}   # idx -> {(columna, fila): [índices de palabra]}
+        for offset, words in enumerate(pages):
+            idx = first_page + offset
+            self._words[idx] = words
+            grid = defaultdict(list)
+            for i, (x1, y1, x2, y2, _) in enumerate(words):
+                for cx in range(int(x1 // cell), int(x2 // cell) + 1):
+                    for cy in range(int(y1 // cell), int(y2 // cell) + 1):
+                        grid[(cx, cy)].append(i)
+            self._grid[idx] = dict(grid)
+
+    @classmethod
+    def extract(cls, path, poppler_path=None, first=None, last=None):
+        """Leer el texto con `pdftotext -bbox` (páginas first..last, base 0; todas por defecto)"""
+        command = [os.path.join(poppler_path, "pdftotext") if poppler_path else "pdftotext", "-bbox"]
+        if first is not None:
+            command += ["-f", str(first + 1)]
+        if last is not None:
+            command += ["-l", str(last + 1)]
+        result = subprocess.run(command + [path, "-"], capture_output=True, check=True,
+                                creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0))
+        return cls(cls.parse(result.stdout.decode("utf-8", "replace")), first_page=first or 0)
+
+    @staticmethod
+    def parse(output):
+        """Palabras de cada página a partir de la salida XHTML de pdftotext -bbox"""
+        pages = []
+        for line in output.splitlines():
+            if _PAGE.search(line):
+                pages.append([])
+                continue
+            match = _WORD.search(line)
+            if match and pages:
+                x1, y1, x2, y2 = (float(v) for v in match.groups()[:4])
+                text = html.unescape(match.group(5)).strip()
+                if text:
+                    pages[-1].append((x1, y1, x2, y2, text))
+        return pages
+
+    def has_text(self, idx=None):
+        """Si la página (o alguna página del documento) tiene texto incrustado"""
+        if idx is not None:
+            return bool(self._words.get(idx))
+        return any(self._words.values())
+
+    def word_count(self):
+        return sum(len(words) for words in self._words.values())
+
+    def text_in(self, idx, box, dpi):
+        """Texto de las palabras cuyo centro cae en la caja (en píxeles a `dpi`), sin espacios como el OCR"""
+        words = self._words.get(idx)
+        if not words:
+            return ""
+        scale = 72 / dpi
+        x1, y1, x2, y2 = (v * scale for v in box)
+        grid = self._grid[idx]
+        candidates = set()
+        for cx in range(int(x1 // self.cell), int(x2 // self.cell) + 1):
+            for cy in range(int(y1 // self.cell), int(y2 // self.cell) + 1):
+                candidates.update(grid.get((cx, cy), ()))
+        inside = []
+        for i in sorted(candidates):
+            wx1, wy1, wx2, wy2, text = words[i]
+            if x1 <= (wx1 + wx2) / 2 <= x2 and y1 <= (wy1 + wy2) / 2 <= y2:
+                inside.append(text)
+        return "".join(inside)
@@ -0,0 +1,123 @@
+"""Miniaturas de las páginas generadas en segundo plano con caché en disco por documento"""
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+
+from PIL import Image
+
+
+def default_thumbnail_dir():
+    """Carpeta raíz de las miniaturas, junto a la caché de resultados"""
+    return os.path.join(os.path.expanduser("~"), ".visualocrtranslator", "thumbnails")
+
+
+def document_key(path):
+    """Identificador del documento: ruta, tamaño y fecha de modificación"""
+    stat = os.stat(path)
+    data = f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()[:32]
+
+
+class ThumbnailStore:
+    """Miniaturas de un documento: memoria (LRU), disco (PNG por página) y generación en segundo plano"""
+
+    def __init__(self, provider, cache_dir=None, size=(150, 200), dpi=30, max_cached=200):
+        self.provider = provider
+        self.size = size
+        self.dpi = dpi
+        self.max_cached = max_cached
+        self.page_count = provider.page_count
+        root = cache_dir or default_thumbnail_dir()
+        self.directory = os.path.join(root, f"{document_key(provider.path)}-{dpi}-{size[0]}x{size[1]}")
+        os.makedirs(self.directory, exist_ok=True)
+        self._images = OrderedDict()  # idx -> miniatura PIL, en orden LRU
+        self._on_disk = {int(name[:-4]) for name in os.listdir(self.directory)
+                         if name.endswith(".png") and name[:-4].isdigit()}
+        self._lock = threading.Lock()
+        self._priority = []  # Páginas visibles, se generan antes que el resto
+        self._stopped = False
+
+    def _file(self, idx):
+        return os.path.join(self.directory, f"{idx}.png")
+
+    def is_ready(self, idx):
+        with self._lock:
+            return idx in self._images or idx in self._on_disk
+
+    def get(self, idx):
+        """Miniatura de la página o None si todavía no se ha generado"""
+        with self._lock:
+            if idx in self._images:
+                self._images.move_to_end(idx)
+                return self._images[idx]
+            if idx not in self._on_disk:
+                return None
+        try:
+            with Image.open(self._file(idx)) as f:
+                thumb = f.convert("RGB")
+        except OSError:
+            with self._lock:
+                self._on_disk.discard(idx)  # Archivo dañado: se vuelve a generar
+            return None
+        with self._lock:
+            self._remember(idx, thumb)
+        return thumb
+
+    def _remember(self, idx, thumb):
+        """Guardar en memoria expulsando las menos usadas (requiere el lock)"""
+        self._images[idx] = thumb
+        self._images.move_to_end(idx)
+        while len(self._images) > self.max_cached:
+            self._images.popitem(last=False)
+
+    def request(self, indices):
+        """Dar prioridad a las páginas visibles que aún no tienen miniatura"""
+        with self._lock:
+            self._priority = [idx for idx in indices if idx not in self._on_disk]
+
+    def _next_range(self, chunk):
+        """Siguiente bloque contiguo a generar: primero lo visible, luego en orden"""
+        with self._lock:
+            self._priority = [idx for idx in self._priority if idx not in self._on_disk]
+            candidates = self._priority or [idx for idx in range(self.page_count) if idx not in self._on_disk]
+            if not candidates:
+                return None
+            first = last = candidates[0]
+            while last + 1 < self.page_count and last + 1 - first < chunk and last + 1 not in self._on_disk:
+                last += 1
+            return first, last
+
+    def generate(self, on_ready=None, chunk=10):
+        """Bucle de la hebra de fondo: genera las miniaturas que faltan y avisa con on_ready(first, last)"""
+        while not self._stopped:
+            pages = self._next_range(chunk)
+            if pages is None:
+                return
+            first, last = pages
+            thumbs = self.provider.render_thumbnails(first, last, size=self.size, dpi=self.dpi)
+            for offset, thumb in enumerate(thumbs):
+                idx = first + offset
+                tmp_path = self._file(idx) + ".tmp"
+                thumb.save(tmp_path, "PNG")
+                os.replace(tmp_path, self._file(idx))
+                with self._lock:
+                    self._on_disk.add(idx)
+                    self._remember(idx, thumb)
+            if on_ready and not self._stopped:
+                on_ready(first, first + len(thumbs) - 1)
+            if not thumbs:
+                return
+
+    def start(self, on_ready=None):
+        """Lanzar la generación en una hebra de fondo"""
+        def worker():
+            try:
+                self.generate(on_ready)
+            except Exception as e:
+                print(f"Error al generar miniaturas: {e}")
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def stop(self):
+        self._stopped = True
@@ -0,0 +1,75 @@
+"""Renderizado de páginas escaladas por teselas con caché acotada por memoria"""
+import threading
+from collections import OrderedDict
+
+from PIL import Image
+
+# Filtros de remuestreo: rápido mientras se hace zoom, LANCZOS cuando la vista está quieta
+FAST = "fast"
+HIGH_QUALITY = "hq"
+_RESAMPLE = {FAST: Image.Resampling.BILINEAR, HIGH_QUALITY: Image.Resampling.LANCZOS}
+
+
+class TileCache:
+    """Teselas escaladas de las páginas (pirámide por nivel de zoom) con expulsión LRU por bytes"""
+
+    def __init__(self, tile_size=512, max_bytes=256 * 1024 * 1024, convert=None):
+        self.tile_size = tile_size
+        self.max_bytes = max_bytes
+        # convert permite guardar directamente el objeto que dibuja la interfaz (p. ej. PhotoImage)
+        self.convert = convert or (lambda tile: tile)
+        self._tiles = OrderedDict()  # (clave de página, zoom, calidad, tx, ty) -> (objeto, bytes)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def visible_tiles(self, width, height, zoom, viewport):
+        """Teselas (tx, ty, x, y) de la página escalada que tocan el viewport (x0, y0, x1, y1)"""
+        scaled_w, scaled_h = int(width * zoom), int(height * zoom)
+        x0, y0, x1, y1 = viewport
+        size = self.tile_size
+        first_tx, last_tx = max(0, int(x0) // size), min((scaled_w - 1) // size, int(x1) // size)
+        first_ty, last_ty = max(0, int(y0) // size), min((scaled_h - 1) // size, int(y1) // size)
+        return [(tx, ty, tx * size, ty * size)
+                for ty in range(first_ty, last_ty + 1)
+                for tx in range(first_tx, last_tx + 1)]
+
+    def render_tile(self, image, zoom, tx, ty, quality):
+        """Remuestrear solo la zona de la página que cubre la tesela"""
+        size = self.tile_size
+        scaled_w, scaled_h = int(image.width * zoom), int(image.height * zoom)
+        left, top = tx * size, ty * size
+        right, bottom = min(left + size, scaled_w), min(top + size, scaled_h)
+        box = (left / zoom, top / zoom, min(right / zoom, image.width), min(bottom / zoom, image.height))
+        if zoom == 1.0:
+            return image.crop((left, top, right, bottom))
+        return image.resize((right - left, bottom - top), _RESAMPLE[quality], box=box)
+
+    def get(self, image, page_key, zoom, tx, ty, quality=FAST):
+        """Devolver la tesela convertida, reutilizando la de alta calidad si ya existe"""
+        with self._lock:
+            for q in (HIGH_QUALITY, quality):
+                key = (page_key, zoom, q, tx, ty)
+                if key in self._tiles:
+                    self._tiles.move_to_end(key)
+                    return self._tiles[key][0]
+        tile = self.render_tile(image, zoom, tx, ty, quality)
+        nbytes = tile.width * tile.height * len(tile.getbands())
+        converted = self.convert(tile)
+        with self._lock:
+            key = (page_key, zoom, quality, tx, ty)
+            if key not in self._tiles:
+                self._tiles[key] = (converted, nbytes)
+                self._bytes += nbytes
+            while self._bytes > self.max_bytes and len(self._tiles) > 1:
+                _, (_, evicted) = self._tiles.popitem(last=False)
+                self._bytes -= evicted
+        return converted
+
+    def has(self, page_key, zoom, tx, ty, quality):
+        with self._lock:
+            return (page_key, zoom, quality, tx, ty) in self._tiles
+
+    def clear(self):
+        with self._lock:
+            self._tiles.clear()
+            self._bytes = 0
@@ -0,0 +1,404 @@
+"""Traducción con un modelo local servido por Ollama"""
+import os
+import json
+import time
+import queue
+import threading
+import http.client
+from urllib.parse import urlsplit
+
+from .cache import ResultCache
+
+# Configuración del modelo de traducción (API HTTP de Ollama)
+DEFAULT_TRANSLATION_CONFIG = {
+    'host': os.environ.get('OLLAMA_HOST', 'http://127.0.0.1:11434'),
+    'model': 'qwen2.5:3b',
+    'keep_alive': '30m',
+    'options': {},
+    'timeout': 120,
+    'prompt': "Traduce este texto del japonés al español, no digas nada, no pongas notas, no expliques nada. solo pasalo al español con un tono natural y precisa: {text}",
+    'batch_prompt': "Traduce del japonés al español cada elemento de este array JSON con un tono natural y preciso. Responde solo con un array JSON de cadenas con la misma cantidad de elementos y en el mismo orden, sin notas ni explicaciones: {items}",
+    # Instrucciones fijas de las sesiones de traducción (el modelo las evalúa una sola vez)
+    'system_prompt': "Eres un traductor del japonés al español. Traduce cada mensaje con un tono natural y preciso, usando los mensajes anteriores como contexto. Responde solo con la traducción, sin notas ni explicaciones.",
+    # Globos anteriores que se mantienen como contexto en cada sesión
+    'context_window': 6,
+    # Se antepone al prompt cuando la memoria de traducción conoce términos del texto
+    'glossary_prompt': "Usa estas traducciones ya establecidas para los términos que aparezcan:\n{terms}\n\n"
+}
+
+class OllamaClient:
+    """Cliente HTTP para la API de Ollama con conexiones persistentes reutilizables"""
+
+    def __init__(self, host="http://127.0.0.1:11434", model="qwen2.5:3b", keep_alive="30m",
+                 options=None, timeout=120, pool_size=2):
+        if "://" not in host:
+            host = "http://" + host
+        parts = urlsplit(host)
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or 11434
+        self.https = parts.scheme == "https"
+        self.model = model
+        self.keep_alive = keep_alive
+        self.options = options or {}
+        self.timeout = timeout
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+
+    def _acquire(self):
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            return cls(self.host, self.port, timeout=self.timeout)
+
+    def _release(self, conn):
+        try:
+            self._pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def _open(self, path, payload):
+        """Enviar un POST JSON por una conexión del pool y devolver (conexión, respuesta)"""
+        body = json.dumps(payload).encode("utf-8")
+        headers = {"Content-Type": "application/json"}
+        # Si una conexión reutilizada estaba cerrada por el servidor, se reintenta una vez
+        for attempt in range(2):
+            conn = self._acquire()
+            try:
+                conn.request("POST", path, body=body, headers=headers)
+                response = conn.getresponse()
+            except (http.client.RemoteDisconnected, http.client.CannotSendRequest,
+                    BrokenPipeError, ConnectionResetError):
+                conn.close()
+                if attempt:
+                    raise
+                continue
+            except Exception:
+                conn.close()
+                raise
+            if response.status != 200:
+                data = response.read()
+                self._release(conn)
+                raise RuntimeError(f"Ollama respondió {response.status}: {data.decode('utf-8', 'replace')}")
+            return conn, response
+
+    def _post(self, path, payload):
+        """Enviar un POST JSON y devolver la respuesta decodificada"""
+        conn, response = self._open(path, payload)
+        try:
+            data = response.read()
+        except Exception:
+            conn.close()
+            raise
+        self._release(conn)
+        return json.loads(data)
+
+    def generate(self, prompt):
+        """Generar una respuesta completa para el prompt"""
+        result = self._post("/api/generate", {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": False,
+            "keep_alive": self.keep_alive,
+            "options": self.options,
+        })
+        return result.get("response", "").strip()
+
+    def _stream(self, path, payload):
+        """Objetos de una respuesta en streaming (líneas NDJSON de la API) hasta el que trae done"""
+        conn, response = self._open(path, payload)
+        finished = False
+        try:
+            for line in response:
+                if not line.strip():
+                    continue
+                chunk = json.loads(line)
+                if chunk.get("error"):
+                    raise RuntimeError(chunk["error"])
+                finished = bool(chunk.get("done"))
+                yield chunk
+                if finished:
+                    break
+        finally:
+            # Una conexión con la respuesta a medio leer no se puede reutilizar
+            if finished:
+                response.read()
+                self._release(conn)
+            else:
+                conn.close()
+
+    def generate_stream(self, prompt):
+        """Generar la respuesta token a token"""
+        chunks = self._stream("/api/generate", {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": True,
+            "keep_alive": self.keep_alive,
+            "options": self.options,
+        })
+        try:
+            for chunk in chunks:
+                if chunk.get("response"):
+                    yield chunk["response"]
+        finally:
+            chunks.close()
+
+    def chat_stream(self, messages, stats=None):
+        """Responder a una conversación token a token; al terminar, stats recibe los contadores de la API"""
+        chunks = self._stream("/api/chat", {
+            "model": self.model,
+            "messages": messages,
+            "stream": True,
+            "keep_alive": self.keep_alive,
+            "options": self.options,
+        })
+        try:
+            for chunk in chunks:
+                content = chunk.get("message", {}).get("content")
+                if content:
+                    yield content
+                if chunk.get("done") and stats is not None:
+                    stats.update(prompt_eval_count=chunk.get("prompt_eval_count"),
+                                 eval_count=chunk.get("eval_count"))
+        finally:
+            chunks.close()
+
+    def preload(self):
+        """Cargar el modelo en memoria sin generar (petición sin prompt)"""
+        self._post("/api/generate", {"model": self.model, "keep_alive": self.keep_alive})
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class TranslationSession:
+    """Conversación con el modelo para una página: prompt de sistema fijo y ventana de globos anteriores
+
+    Los mensajes solo se añaden al final, así Ollama reutiliza el prefijo ya evaluado
+    (instrucciones y globos anteriores) y solo procesa el texto nuevo. Al llenarse la
+    ventana se descarta de golpe la mitad más antigua, no un globo por petición, para
+    que el prefijo siga siendo estable en las peticiones siguientes.
+    """
+
+    def __init__(self, system_prompt, window=6):
+        self.system_prompt = system_prompt
+        self.window = window
+        self.history = []  # [(mensaje enviado, traducción)]
+        # Una sesión atiende una petición a la vez; el resto va sin contexto
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.reused_tokens = 0
+        self._state_tokens = 0  # Tokens de la conversación que el servidor ya tiene evaluados
+
+    def messages(self, content):
+        messages = [{"role": "system", "content": self.system_prompt}]
+        for sent, translation in self.history:
+            messages.append({"role": "user", "content": sent})
+            messages.append({"role": "assistant", "content": translation})
+        messages.append({"role": "user", "content": content})
+        return messages
+
+    def record(self, content, translation, stats=None):
+        """Añadir el globo a la ventana e informar de los tokens del prompt reutilizados (requiere el lock)"""
+        if stats and stats.get("prompt_eval_count") is not None:
+            # Ollama informa del prompt completo; la parte reutilizada es la conversación anterior
+            prompt = stats["prompt_eval_count"]
+            reused = min(self._state_tokens, prompt)
+            self.requests += 1
+            self.prompt_tokens += prompt
+            self.reused_tokens += reused
+            self._state_tokens = prompt + (stats.get("eval_count") or 0)
+            print(f"Sesión de traducción: prompt de {prompt} tokens, ~{reused} reutilizados "
+                  f"({prompt - reused} evaluados)")
+        if len(self.history) >= self.window:
+            del self.history[:len(self.history) - self.window // 2]
+            self._state_tokens = 0
+        if self.window:
+            self.history.append((content, translation))
+
+    def summary(self):
+        saved = self.reused_tokens / self.prompt_tokens * 100 if self.prompt_tokens else 0
+        return (f"Sesión de traducción: {self.requests} peticiones, ~{self.reused_tokens} de "
+                f"{self.prompt_tokens} tokens de prompt reutilizados ({saved:.0f}%)")
+
+
+class Translator:
+    """Traducción de textos sueltos o por lotes con caché de resultados y memoria de traducción"""
+
+    def __init__(self, config=None, cache=None, memory=None):
+        self.config = dict(DEFAULT_TRANSLATION_CONFIG)
+        self.config.update(config or {})
+        self.cache = cache
+        self.memory = memory  # TranslationMemory del proyecto o serie (opcional)
+        self.client = OllamaClient(host=self.config['host'],
+                                   model=self.config['model'],
+                                   keep_alive=self.config['keep_alive'],
+                                   options=self.config['options'],
+                                   timeout=self.config['timeout'])
+        # Tiempo del modelo por texto traducido, para estimar lo que ahorra no llamarlo
+        self.llm_seconds = 0.0
+        self.llm_texts = 0
+        self._stats_lock = threading.Lock()
+
+    def _record_latency(self, seconds, texts):
+        with self._stats_lock:
+            self.llm_seconds += seconds
+            self.llm_texts += texts
+
+    def average_latency(self):
+        """Segundos medios por texto traducido por el modelo (sin contar la caché), o None"""
+        with self._stats_lock:
+            return self.llm_seconds / self.llm_texts if self.llm_texts else None
+
+    def _key(self, text, session=None):
+        # Las traducciones hechas en una sesión dependen de sus instrucciones: no se mezclan con las sueltas
+        prompt = session.system_prompt if session else self.config['prompt']
+        return ResultCache.translation_key(text, self.client.model, prompt)
+
+    def cached(self, text, session=None):
+        """Traducción guardada del texto (hecha en una sesión si se indica) o None"""
+        if not self.cache:
+            return None
+        return self.cache.get("translation", self._key(text, session))
+
+    def remembered(self, text):
+        """Traducción de la memoria para el texto o uno casi igual, o None"""
+        if not self.memory:
+            return None
+        match = self.memory.lookup(text)
+        if match is None:
+            return None
+        if match.score < 1:
+            print(f"Memoria de traducción: coincidencia aproximada ({match.score:.2f}) con «{match.source}»")
+        return match.target
+
+    def _remember(self, text, translation):
+        if self.memory and translation:
+            self.memory.add(text, translation)
+
+    def _with_glossary(self, prompt, texts):
+        """Anteponer al prompt los términos de la memoria que aparecen en los textos"""
+        if not self.memory:
+            return prompt
+        terms = {}
+        for text in texts:
+            terms.update(self.memory.glossary(text))
+        if not terms:
+            return prompt
+        lines = "\n".join(f"{source} = {target}" for source, target in terms.items())
+        return self.config['glossary_prompt'].format(terms=lines) + prompt
+
+    def new_session(self):
+        """Sesión con contexto para los globos de una página (ver TranslationSession)"""
+        return TranslationSession(self.config['system_prompt'], self.config['context_window'])
+
+    def stream(self, text, session=None):
+        """Traducir token a token; la traducción completa se guarda en caché al terminar
+
+        Con session la petición reutiliza la conversación de la página si está libre.
+        """
+        cached = self.cached(text, session)
+        if cached is None:
+            cached = self.remembered(text)
+        if cached is not None:
+            # Sirve también de contexto para los globos siguientes
+            if session and session.lock.acquire(blocking=False):
+                try:
+                    session.record(text, cached)
+                finally:
+                    session.lock.release()
+            yield cached
+            return
+
+        parts = []
+        start = time.perf_counter()
+        key = self._key(text, session)
+        if session and session.lock.acquire(blocking=False):
+            try:
+                content = self._with_glossary(text, [text])
+                stats = {}
+                for chunk in self._stream_chunks(self.client.chat_stream(session.messages(content), stats), parts):
+                    yield chunk
+                if parts:
+                    session.record(content, "".join(parts).strip(), stats)
+            finally:
+                session.lock.release()
+        else:
+            key = self._key(text)  # Sesión ocupada: petición suelta, caché de las sueltas
+            prompt = self._with_glossary(self.config['prompt'].format(text=text), [text])
+            for chunk in self._stream_chunks(self.client.generate_stream(prompt), parts):
+                yield chunk
+        # Solo se llega aquí si quien consume el generador leyó la respuesta entera
+        if parts:
+            self._record_latency(time.perf_counter() - start, 1)
+        if parts and self.cache:
+            self.cache.put("translation", key, "".join(parts).strip())
+        if parts:
+            self._remember(text, "".join(parts).strip())
+
+    @staticmethod
+    def _stream_chunks(chunks, parts):
+        """Reenviar los fragmentos sin los espacios iniciales, acumulándolos en parts"""
+        try:
+            for chunk in chunks:
+                if not parts:
+                    chunk = chunk.lstrip()
+                    if not chunk:
+                        continue
+                parts.append(chunk)
+                yield chunk
+        finally:
+            chunks.close()
+
+    def translate(self, text, session=None):
+        return "".join(self.stream(text, session)).strip()
+
+    def translate_texts(self, texts, cancelled=None):
+        """Traducir varios textos en una petición (array JSON de entrada y de salida)"""
+        results = [self.cached(text) for text in texts]
+        results = [self.remembered(text) if result is None else result for text, result in zip(texts, results)]
+        missing = [i for i, result in enumerate(results) if result is None]
+        if not missing:
+            return results
+
+        start = time.perf_counter()
+        prompt = self._with_glossary(self.config['batch_prompt'].format(
+            items=json.dumps([texts[i] for i in missing], ensure_ascii=False)), [texts[i] for i in missing])
+        translations = self.parse_batch_response(self.client.generate(prompt), len(missing))
+        if translations is None:
+            # Respuesta no válida: una petición por elemento
+            print(f"Respuesta por lotes no válida, traduciendo {len(missing)} elementos por separado")
+            translations = []
+            for i in missing:
+                if cancelled and cancelled():
+                    return None
+                translations.append(self.client.generate(
+                    self._with_glossary(self.config['prompt'].format(text=texts[i]), [texts[i]])))
+
+        self._record_latency(time.perf_counter() - start, len(missing))
+        for i, translation in zip(missing, translations):
+            results[i] = translation.strip()
+            if self.cache and results[i]:
+                self.cache.put("translation", self._key(texts[i]), results[i])
+            self._remember(texts[i], results[i])
+        return results
+
+    @staticmethod
+    def parse_batch_response(response, expected):
+        """Extraer el array JSON de la respuesta; None si no coincide con lo esperado"""
+        start, end = response.find("["), response.rfind("]")
+        if start < 0 or end <= start:
+            return None
+        try:
+            items = json.loads(response[start:end + 1])
+        except ValueError:
+            return None
+        if not isinstance(items, list) or len(items) != expected:
+            return None
+        if not all(isinstance(item, str) for item in items):
+            return None
+        return items